@@ -0,0 +1,302 @@
+"""
+Benchmarks of whmcspy against a local fake WHMCS server.
+
+Run from the repository root, for example::
+
+    python benchmarks/bench.py --items 5000 --latency 0.005
+
+"""
+import argparse
+import contextlib
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import whmcspy  # noqa: E402
+from whmcspy import transport  # noqa: E402
+import fake_server  # noqa: E402
+from fake_server import FakeWHMCS  # noqa: E402
+
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Register a benchmark.
+
+    A benchmark is called with the WHMCS interface and the parsed arguments
+    and returns the number of items it processed. For the paginated
+    benchmarks every call is a page, so calls/s equals pages/s.
+
+    """
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+def _attempt(args, function, *params, **kwargs):
+    """
+    Perform a call, counting a failure instead of raising it.
+
+    """
+    try:
+        function(*params, **kwargs)
+    except Exception:
+        args.errors += 1
+
+
+@benchmark('call')
+def bench_call(whmcs, args):
+    for invoiceid in range(args.calls):
+        _attempt(args, whmcs.call, 'GetInvoice', invoiceid=invoiceid)
+    return args.calls
+
+
+@benchmark('call_error')
+def bench_call_error(whmcs, args):
+    for _ in range(args.calls):
+        try:
+            whmcs.call('GetPermissionDenied')
+        except whmcspy.MissingPermission:
+            pass
+    return args.calls
+
+
+@benchmark('add_order')
+def bench_add_order(whmcs, args):
+    for clientid in range(args.calls):
+        _attempt(
+            args,
+            whmcs.add_order,
+            clientid,
+            products=[{'id': 1, 'domain': 'domain.example'}])
+    return args.calls
+
+
+@benchmark('get_invoice')
+def bench_get_invoice(whmcs, args):
+    for invoiceid in range(args.calls):
+        _attempt(args, whmcs.get_invoice, invoiceid)
+    return args.calls
+
+
+@benchmark('paginated_call')
+def bench_paginated_call(whmcs, args):
+    items = 0
+    for response in whmcs.paginated_call(
+            'GetOrders',
+            **_list_params(args)):
+        items += response['numreturned']
+    return items
+
+
+def _list_benchmark(method):
+    def bench(whmcs, args):
+        items = 0
+        for _ in getattr(whmcs, method)(**_list_params(args)):
+            items += 1
+        return items
+    return bench
+
+
+for _method in (
+        'get_clients_domains',
+        'get_clients_products',
+        'get_orders',
+        'get_tickets',
+        'get_transactions'):
+    benchmark(_method)(_list_benchmark(_method))
+
+
+@benchmark('get_orders_partitioned')
+def bench_get_orders_partitioned(whmcs, args):
+    items = 0
+    for _ in whmcs.get_orders(
+            partitions=[
+                {'status': status}
+                for status in sorted(set(fake_server.STATUSES))
+            ],
+            **_list_params(args)):
+        items += 1
+    return items
+
+
+def _list_params(args):
+    params = {
+        'limitnum': args.limitnum,
+    }
+    if args.workers:
+        params['workers'] = args.workers
+    if args.stream:
+        params['stream'] = True
+    if args.typed:
+        params['typed'] = True
+    return params
+
+
+def _serve(options, urls):
+    fake = FakeWHMCS(**options)
+    urls.put(fake.url)
+    fake.server.serve_forever()
+
+
+@contextlib.contextmanager
+def serve(**options):
+    """
+    Run the fake server in a separate process.
+
+    This way the server doesn't count toward the memory (and CPU) used by
+    the benchmarks.
+
+    Args:
+        **options: The params of :class:`FakeWHMCS`.
+
+    Yields:
+        str: The URL of the API.
+
+    """
+    urls = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=_serve,
+        args=(options, urls),
+        daemon=True)
+    process.start()
+    try:
+        yield urls.get(timeout=30)
+    finally:
+        process.terminate()
+        process.join()
+
+
+def run(name, url, args):
+    """
+    Run a benchmark.
+
+    Args:
+        name (str): The name of the benchmark.
+        url (str): The URL of the fake server.
+        args: The parsed arguments.
+
+    Returns:
+        dict: The results.
+
+    """
+    pool_maxsize = max(10, args.workers or 0)
+    transport_ = None
+    if args.record:
+        transport_ = transport.RecordingTransport(
+            transport.create(args.transport, pool_maxsize=pool_maxsize),
+            args.record)
+    elif args.replay:
+        transport_ = transport.ReplayTransport(args.replay)
+    whmcs = whmcspy.WHMCS(
+        url,
+        'identifier',
+        'secret',
+        pool_maxsize=pool_maxsize,
+        retries=args.retries,
+        backoff_factor=0,
+        transport=transport_ or args.transport)
+    args.errors = 0
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(whmcs)
+        if transport_ is not None:
+            stack.callback(transport_.close)
+        if args.memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        items = BENCHMARKS[name](whmcs, args)
+        duration = time.perf_counter() - start
+        peak = None
+        if args.memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    calls = whmcs.transport.stats['requests']
+    return {
+        'name': name,
+        'duration': duration,
+        'calls': calls / duration,
+        'items': items / duration,
+        'peak': peak,
+        'errors': args.errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split('\n\n')[0])
+    parser.add_argument(
+        'benchmarks',
+        nargs='*',
+        help='The benchmarks to run, defaults to all. Available: '
+             f'{", ".join(sorted(BENCHMARKS))}.')
+    parser.add_argument('--calls', type=int, default=500)
+    parser.add_argument('--items', type=int, default=5000)
+    parser.add_argument('--item-size', type=int, default=0)
+    parser.add_argument('--limitnum', type=int, default=250)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument(
+        '--offset-latency',
+        type=float,
+        default=0.0,
+        help='The latency added per 1000 items skipped by a page.')
+    parser.add_argument('--workers', type=int, default=0)
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=0,
+        help='Retry failed calls, required by the paginated benchmarks when '
+             'using --failure-rate.')
+    parser.add_argument('--stream', action='store_true')
+    parser.add_argument('--typed', action='store_true')
+    parser.add_argument(
+        '--transport',
+        choices=transport.TRANSPORTS,
+        default='requests')
+    parser.add_argument(
+        '--record',
+        metavar='CASSETTE',
+        help='Record the calls to a cassette.')
+    parser.add_argument(
+        '--replay',
+        metavar='CASSETTE',
+        help='Replay the calls from a cassette recorded with the same '
+             'options instead of calling the fake server.')
+    parser.add_argument(
+        '--memory',
+        action='store_true',
+        help='Measure the peak memory (slows down the benchmarks).')
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error(f'unknown benchmark: {name}')
+    server = serve(
+        latency=args.latency,
+        items=args.items,
+        item_size=args.item_size,
+        failure_rate=args.failure_rate,
+        offset_latency=args.offset_latency)
+    print(
+        f'{"benchmark":<22}{"seconds":>10}{"calls/s":>12}'
+        f'{"items/s":>12}{"peak KiB":>12}{"errors":>8}')
+    with server as url:
+        for name in args.benchmarks or sorted(BENCHMARKS):
+            result = run(name, url, args)
+            peak = '-'
+            if result['peak'] is not None:
+                peak = f'{result["peak"] / 1024:.0f}'
+            print(
+                f'{name:<22}{result["duration"]:>10.3f}'
+                f'{result["calls"]:>12.1f}{result["items"]:>12.1f}'
+                f'{peak:>12}{result["errors"]:>8}')
+
+
+if __name__ == '__main__':
+    main()
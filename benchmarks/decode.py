@@ -0,0 +1,123 @@
+"""
+Benchmark of the JSON backends decoding recorded responses.
+
+The responses are read from a cassette (see
+:class:`whmcspy.transport.RecordingTransport`). Without a cassette
+representative responses of the fake WHMCS server are recorded first.
+
+Run from the repository root, for example::
+
+    python benchmarks/decode.py --items 250 --item-size 200
+    python benchmarks/decode.py --cassette production.cassette
+
+"""
+import argparse
+import collections
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import whmcspy  # noqa: E402
+from whmcspy import decoding  # noqa: E402
+from whmcspy import transport  # noqa: E402
+from fake_server import FakeWHMCS  # noqa: E402
+
+
+CALLS = (
+    ('GetClientsProducts', {'limitnum': 250}),
+    ('GetOrders', {'limitnum': 250}),
+    ('GetTickets', {'limitnum': 250}),
+    ('GetTLDPricing', {}),
+    ('GetInvoice', {'invoiceid': 1}),
+)
+"""
+The calls recorded from the fake server.
+"""
+
+
+def record(path, items, item_size):
+    """
+    Record the responses of the fake server to a cassette.
+
+    Args:
+        path (str): The path of the cassette.
+        items (int): The number of items of list actions (and TLDs).
+        item_size (int): The number of padding characters per item.
+
+    """
+    recorder = transport.RecordingTransport(
+        transport.SessionTransport(),
+        path)
+    with FakeWHMCS(items=items, item_size=item_size) as fake:
+        whmcs = whmcspy.WHMCS(
+            fake.url,
+            'identifier',
+            'secret',
+            transport=recorder)
+        for action, params in CALLS:
+            whmcs.call(action, **params)
+    recorder.close()
+
+
+def payloads(path):
+    """
+    Get the largest recorded response body per action.
+
+    Args:
+        path (str): The path of the cassette.
+
+    Returns:
+        dict: The bodies by action.
+
+    """
+    replay = transport.ReplayTransport(path)
+    bodies = collections.defaultdict(bytes)
+    for key, response in replay.responses():
+        action = key.split('"')[1]
+        if len(response.content) > len(bodies[action]):
+            bodies[action] = response.content
+    replay.close()
+    return dict(bodies)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split('\n\n')[0])
+    parser.add_argument('--cassette', help='The cassette to read.')
+    parser.add_argument('--items', type=int, default=250)
+    parser.add_argument('--item-size', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    backends = {}
+    for name in decoding.BACKENDS:
+        try:
+            backends[name] = decoding.backend(name)
+        except ImportError:
+            print(f'{name} is not installed')
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.cassette
+        if path is None:
+            path = os.path.join(directory, 'decode.cassette')
+            record(path, args.items, args.item_size)
+        bodies = payloads(path)
+    print(
+        f'{"action":<22}{"KiB":>10}'
+        + ''.join(f'{f"{name} MB/s":>14}' for name in backends))
+    for action, body in sorted(bodies.items()):
+        number = max(1, 10 ** 6 // max(1, len(body)))
+        row = f'{action:<22}{len(body) / 1024:>10.1f}'
+        for loads in backends.values():
+            seconds = min(timeit.repeat(
+                lambda: loads(body),
+                number=number,
+                repeat=args.repeat)) / number
+            row += f'{len(body) / seconds / 10 ** 6:>14.1f}'
+        print(row)
+    print(f'Default backend: {decoding.backend().__module__}')
+
+
+if __name__ == '__main__':
+    main()
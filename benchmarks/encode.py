@@ -0,0 +1,150 @@
+"""
+Micro-benchmark of payload encoding.
+
+Compares :func:`whmcspy.encoding.encode` with the previous path, which
+formatted array params into the params dict and let requests urlencode it.
+
+Run from the repository root, for example::
+
+    python benchmarks/encode.py --size 5000
+
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import requests.models
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from whmcspy import api  # noqa: E402
+from whmcspy import encoding  # noqa: E402
+
+
+def legacy_order_params(clientid, domains, products):
+    """
+    Build the AddOrder params one array item at a time.
+
+    """
+    params = {
+        'clientid': clientid,
+        'paymentmethod': 'banktransfer',
+    }
+    for i, domain in enumerate(domains):
+        params[f'domain[{i}]'] = domain
+        params[f'domaintype[{i}]'] = 'register'
+        params[f'domainpriceoverride[{i}]'] = 0
+        params[f'domainrenewoverride[{i}]'] = 0
+    for i, product in enumerate(products):
+        params[f'pid[{i}]'] = product['id']
+        params[f'domain[{i}]'] = product['domain']
+    return params
+
+
+def legacy_encode(params):
+    """
+    Format array params in place and urlencode them like requests does.
+
+    """
+    for key, value in list(params.items()):
+        if isinstance(value, list):
+            for index, item in enumerate(value):
+                params[f'{key}[{index}]'] = item
+            del params[key]
+    return requests.models.RequestEncodingMixin._encode_params(params)
+
+
+def payloads(size):
+    """
+    Get the representative payloads per name as (legacy, new) callables.
+
+    """
+    domains = [f'domain{i}.example' for i in range(size)]
+    products = [
+        {'id': i % 50, 'domain': f'product{i}.example'}
+        for i in range(size)
+    ]
+    cycles = ('monthly', 'quarterly', 'semiannually', 'annually')
+    currencies = range(1, size // len(cycles) + 1)
+    pricing = {
+        currency: {cycle: f'{currency}.99' for cycle in cycles}
+        for currency in currencies
+    }
+    flat_pricing = {
+        f'pricing[{currency}][{cycle}]': price
+        for currency, prices in pricing.items()
+        for cycle, price in prices.items()
+    }
+    base = {
+        'identifier': 'identifier',
+        'secret': 'secret',
+        'responsetype': 'json',
+    }
+    return {
+        'add_order': (
+            lambda: legacy_encode(dict(
+                base,
+                action='AddOrder',
+                **legacy_order_params(1, domains, products))),
+            lambda: encoding.encode(dict(
+                base,
+                action='AddOrder',
+                **api._order_params(
+                    1,
+                    domains,
+                    'banktransfer',
+                    products,
+                    {}))),
+        ),
+        'add_product': (
+            lambda: legacy_encode(dict(
+                base,
+                action='AddProduct',
+                name='Product',
+                gid=1,
+                **flat_pricing)),
+            lambda: encoding.encode(dict(
+                base,
+                action='AddProduct',
+                name='Product',
+                gid=1,
+                pricing=pricing)),
+        ),
+        'get_invoice': (
+            lambda: legacy_encode(dict(
+                base,
+                action='GetInvoice',
+                invoiceid=1)),
+            lambda: encoding.encode(dict(
+                base,
+                action='GetInvoice',
+                invoiceid=1)),
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split('\n\n')[0])
+    parser.add_argument(
+        '--size',
+        type=int,
+        default=5000,
+        help='The number of array items in the large payloads.')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    print(f'{"payload":<14}{"legacy ms":>12}{"encode ms":>12}{"speedup":>10}')
+    for name, (legacy, new) in payloads(args.size).items():
+        number = 10000 if name == 'get_invoice' else 1
+        legacy_time, new_time = (
+            min(timeit.repeat(function, number=number, repeat=args.repeat))
+            / number * 1000
+            for function in (legacy, new))
+        print(
+            f'{name:<14}{legacy_time:>12.3f}{new_time:>12.3f}'
+            f'{legacy_time / new_time:>9.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,587 @@
+"""
+A local stand-in for the WHMCS API.
+
+The server emulates the WHMCS ``api.php`` endpoint for a subset of actions,
+with configurable latency, payload size and failure rate, so whmcspy can be
+benchmarked without a WHMCS installation.
+
+Run it standalone with ``python benchmarks/fake_server.py``.
+
+"""
+import argparse
+import http.server
+import json
+import random
+import threading
+import time
+import urllib.parse
+
+
+STATUSES = (
+    'Active',
+    'Active',
+    'Active',
+    'Pending',
+    'Suspended',
+    'Terminated',
+    'Cancelled',
+)
+
+
+def _date(i):
+    return f'20{10 + i % 15:02d}-{1 + i % 12:02d}-{1 + i % 28:02d}'
+
+
+def _order(i, padding):
+    return {
+        'id': i,
+        'ordernum': 1000000000 + i,
+        'userid': 1 + i % 5000,
+        'contactid': 0,
+        'date': f'{_date(i)} 12:00:00',
+        'nameservers': '',
+        'transfersecret': '',
+        'renewals': '',
+        'promocode': '',
+        'promotype': '',
+        'promovalue': '',
+        'orderdata': '[]',
+        'amount': f'{i % 1000}.95',
+        'paymentmethod': 'banktransfer',
+        'invoiceid': i,
+        'status': STATUSES[i % len(STATUSES)],
+        'ipaddress': '127.0.0.1',
+        'fraudmodule': '',
+        'fraudoutput': '',
+        'notes': padding,
+        'paymentmethodname': 'Bank Transfer',
+        'paymentstatus': 'Paid',
+        'name': f'Client {1 + i % 5000}',
+        'currencyprefix': '$',
+        'currencysuffix': ' USD',
+        'frauddata': '',
+        'lineitems': {
+            'lineitem': [
+                {
+                    'type': 'product',
+                    'relid': i,
+                    'producttype': 'Shared Hosting',
+                    'product': 'Starter',
+                    'domain': f'domain{i}.example',
+                    'billingcycle': 'Annually',
+                    'amount': f'${i % 1000}.95 USD',
+                    'status': 'Active',
+                },
+            ],
+        },
+    }
+
+
+def _product(i, padding):
+    return {
+        'id': i,
+        'clientid': 1 + i % 5000,
+        'orderid': i,
+        'pid': 1 + i % 20,
+        'regdate': _date(i),
+        'name': 'Starter',
+        'translated_name': 'Starter',
+        'groupname': 'Hosting',
+        'translated_groupname': 'Hosting',
+        'domain': f'domain{i}.example',
+        'dedicatedip': '',
+        'serverid': 1,
+        'servername': 'server1',
+        'serverip': '127.0.0.1',
+        'serverhostname': 'server1.example',
+        'suspensionreason': '',
+        'firstpaymentamount': '10.00',
+        'recurringamount': '10.00',
+        'paymentmethod': 'banktransfer',
+        'paymentmethodname': 'Bank Transfer',
+        'billingcycle': 'Annually',
+        'nextduedate': _date(i + 1),
+        'status': STATUSES[i % len(STATUSES)],
+        'username': f'user{i}',
+        'password': '',
+        'subscriptionid': '',
+        'promoid': 0,
+        'overideautosuspend': 0,
+        'overidesuspenduntil': '0000-00-00',
+        'ns1': '',
+        'ns2': '',
+        'assignedips': '',
+        'notes': padding,
+        'diskusage': i % 1000,
+        'disklimit': 1000,
+        'bwusage': i % 10000,
+        'bwlimit': 10000,
+        'lastupdate': '0000-00-00 00:00:00',
+        'customfields': {'customfield': []},
+        'configoptions': {'configoption': []},
+    }
+
+
+def _domain(i, padding):
+    return {
+        'id': i,
+        'userid': 1 + i % 5000,
+        'orderid': i,
+        'regtype': 'Register',
+        'domainname': f'domain{i}.example',
+        'registrar': 'example',
+        'regperiod': 1,
+        'firstpaymentamount': '10.00',
+        'recurringamount': '10.00',
+        'paymentmethod': 'banktransfer',
+        'paymentmethodname': 'Bank Transfer',
+        'regdate': _date(i),
+        'expirydate': _date(i + 365),
+        'nextduedate': _date(i + 365),
+        'status': STATUSES[i % len(STATUSES)],
+        'subscriptionid': '',
+        'promoid': 0,
+        'dnsmanagement': 0,
+        'emailforwarding': 0,
+        'idprotection': 0,
+        'donotrenew': 0,
+        'notes': padding,
+    }
+
+
+def _ticket(i, padding):
+    return {
+        'id': i,
+        'tid': f'ABC-{i:06d}',
+        'deptid': 1 + i % 3,
+        'userid': 1 + i % 5000,
+        'name': f'Client {1 + i % 5000}',
+        'email': f'client{1 + i % 5000}@example.com',
+        'cc': '',
+        'c': f'{i:08x}',
+        'date': f'{_date(i)} 12:00:00',
+        'subject': f'Ticket {i}',
+        'status': ('Open', 'Answered', 'Customer-Reply', 'Closed')[i % 4],
+        'priority': 'Medium',
+        'admin': '',
+        'attachment': '',
+        'lastreply': f'{_date(i)} 13:00:00',
+        'flag': 0,
+        'service': '',
+        'message': padding,
+    }
+
+
+def _client(i, padding):
+    return {
+        'id': i,
+        'firstname': 'Client',
+        'lastname': str(i),
+        'companyname': '',
+        'email': f'client{i}@example.com',
+        'datecreated': _date(i),
+        'groupid': 0,
+        'status': STATUSES[i % len(STATUSES)],
+    }
+
+
+def _transaction(i, padding):
+    return {
+        'id': i,
+        'userid': 1 + i % 5000,
+        'currency': 0,
+        'gateway': 'banktransfer',
+        'date': f'{_date(i)} 12:00:00',
+        'description': f'Invoice Payment (#{i})',
+        'amountin': f'{i % 1000}.95',
+        'fees': '0.00',
+        'amountout': '0.00',
+        'rate': '1.00000',
+        'transid': f'TX{i:08d}',
+        'invoiceid': i,
+        'refundid': 0,
+    }
+
+
+LISTS = {
+    'GetClients': ('clients', 'client', _client),
+    'GetClientsDomains': ('domains', 'domain', _domain),
+    'GetClientsProducts': ('products', 'product', _product),
+    'GetOrders': ('orders', 'order', _order),
+    'GetTickets': ('tickets', 'ticket', _ticket),
+}
+"""
+The paginated list actions with their containers and item factories.
+"""
+
+
+FILTERS = {
+    'GetClients': {},
+    'GetClientsDomains': {
+        'clientid': 'userid',
+        'domain': 'domainname',
+    },
+    'GetClientsProducts': {
+        'clientid': 'clientid',
+        'domain': 'domain',
+        'pid': 'pid',
+    },
+    'GetOrders': {
+        'status': 'status',
+        'userid': 'userid',
+    },
+    'GetTickets': {
+        'clientid': 'userid',
+        'status': 'status',
+    },
+}
+"""
+The params by which the list actions can be filtered, with the fields they
+filter on.
+"""
+
+
+class FakeWHMCS:
+    """
+    A fake WHMCS API server.
+
+    """
+    def __init__(
+            self,
+            host='127.0.0.1',
+            port=0,
+            latency=0.0,
+            items=1000,
+            item_size=0,
+            failure_rate=0.0,
+            denied_actions=('GetPermissionDenied',),
+            offset_latency=0.0):
+        """
+        Create a new instance.
+
+        Keyword Args:
+            host (str): The host to listen on.
+            port (int): The port to listen on, 0 for a random free port.
+            latency (float): The latency in seconds added to every response.
+            items (int): The number of items of every list action.
+            item_size (int): The number of padding characters per item.
+            failure_rate (float): The fraction of requests which fail with
+                an HTTP 500 error.
+            denied_actions (tuple): Actions which are refused with an HTTP
+                403 error.
+            offset_latency (float): The latency in seconds added per 1000
+                skipped items (`limitstart`) of a list action, like the
+                OFFSET queries of WHMCS slow down when paging deeper.
+
+        """
+        self.latency = latency
+        self.items = items
+        self.padding = 'x' * item_size
+        self.failure_rate = failure_rate
+        self.denied_actions = set(denied_actions)
+        self.offset_latency = offset_latency
+        self._filtered = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.server = http.server.ThreadingHTTPServer(
+            (host, port),
+            self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        The URL of the API.
+
+        """
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/includes/api.php'
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        """
+        Start serving in a background thread.
+
+        """
+        self._thread = threading.Thread(
+            target=self.server.serve_forever,
+            daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop serving.
+
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+    def respond(self, params):
+        """
+        Create the response to an API call.
+
+        Args:
+            params (dict): The params of the call.
+
+        Returns:
+            tuple: The HTTP status code and the response data.
+
+        """
+        with self._lock:
+            self.requests += 1
+        action = params.get('action')
+        if self.failure_rate and random.random() < self.failure_rate:
+            return 500, None
+        if action in self.denied_actions:
+            return 403, {
+                'result': 'error',
+                'message': 'Invalid Permissions: API action '
+                           f'"{action.lower()}" is not allowed',
+            }
+        if action in LISTS:
+            return 200, self.list(action, params)
+        if action == 'GetTransactions':
+            return 200, self.transactions(params)
+        if action == 'GetTLDPricing':
+            return 200, self.tld_pricing()
+        if action == 'AddOrder':
+            with self._lock:
+                orderid = self.requests
+            return 200, {
+                'result': 'success',
+                'orderid': orderid,
+                'serviceids': str(orderid),
+                'addonids': '',
+                'domainids': '',
+                'invoiceid': orderid,
+            }
+        if action == 'GetInvoice':
+            invoiceid = int(params.get('invoiceid', 0))
+            return 200, {
+                'result': 'success',
+                'invoiceid': invoiceid,
+                'invoicenum': '',
+                'userid': 1 + invoiceid % 5000,
+                'date': _date(invoiceid),
+                'duedate': _date(invoiceid + 14),
+                'subtotal': '10.00',
+                'total': '12.10',
+                'balance': '0.00',
+                'status': 'Paid',
+                'paymentmethod': 'banktransfer',
+                'notes': self.padding,
+                'items': {
+                    'item': [
+                        {
+                            'id': invoiceid,
+                            'type': 'Hosting',
+                            'relid': invoiceid,
+                            'description': 'Starter',
+                            'amount': '10.00',
+                            'taxed': 1,
+                        },
+                    ],
+                },
+                'transactions': '',
+            }
+        return 200, {
+            'result': 'error',
+            'message': 'Command Not Found',
+        }
+
+    def list(self, action, params):
+        """
+        Create the response of a paginated list action.
+
+        Args:
+            action (str): The list action.
+            params (dict): The params of the call.
+
+        Returns:
+            dict: The response data.
+
+        """
+        container, item, factory = LISTS[action]
+        limitstart = int(params.get('limitstart', 0))
+        limitnum = int(params.get('limitnum', 25))
+        filters = {
+            field: params[param]
+            for param, field in FILTERS[action].items()
+            if param in params
+        }
+        if filters:
+            key = action, tuple(sorted(filters.items()))
+            with self._lock:
+                indices = self._filtered.get(key)
+            if indices is None:
+                indices = [
+                    i
+                    for i in range(self.items)
+                    if all(
+                        str(factory(1 + i, '')[field]) == value
+                        for field, value in filters.items())
+                ]
+                with self._lock:
+                    self._filtered[key] = indices
+            total = len(indices)
+            items = [
+                factory(1 + i, self.padding)
+                for i in indices[limitstart:limitstart + limitnum]
+            ]
+        else:
+            total = self.items
+            items = [
+                factory(1 + i, self.padding)
+                for i in range(limitstart, min(total, limitstart + limitnum))
+            ]
+        return {
+            'result': 'success',
+            'totalresults': total,
+            'startnumber': limitstart,
+            'numreturned': len(items),
+            container: {
+                item: items,
+            },
+        }
+
+    def tld_pricing(self):
+        """
+        Create the response to a GetTLDPricing call.
+
+        There is a TLD per item with prices for 1 to 10 years.
+
+        Returns:
+            dict: The response data.
+
+        """
+        def prices(i, base):
+            return {
+                str(years): f'{base * years + i % 100:.2f}'
+                for years in range(1, 11)
+            }
+
+        return {
+            'result': 'success',
+            'currency': {
+                'id': 1,
+                'code': 'USD',
+                'prefix': '$',
+                'suffix': ' USD',
+                'format': 1,
+                'rate': '1.00000',
+            },
+            'pricing': {
+                f'tld{i}': {
+                    'categories': ['Other'],
+                    'addons': {
+                        'dns': True,
+                        'email': True,
+                        'idprotect': i % 2 == 0,
+                    },
+                    'group': '',
+                    'register': prices(i, 9.99),
+                    'transfer': prices(i, 8.99),
+                    'renew': prices(i, 10.99),
+                    'grace_period': None,
+                    'redemption_period': None,
+                }
+                for i in range(1, self.items + 1)
+            },
+        }
+
+    def transactions(self, params):
+        """
+        Create the response of a GetTransactions call.
+
+        All matching transactions are returned at once, like WHMCS does. The
+        first 5000 clients have transactions.
+
+        Args:
+            params (dict): The params of the call.
+
+        Returns:
+            dict: The response data.
+
+        """
+        ids = range(1, self.items + 1)
+        if 'clientid' in params:
+            clientid = int(params['clientid'])
+            ids = ()
+            if 0 < clientid <= 5000:
+                ids = range(clientid - 1 or 5000, self.items + 1, 5000)
+        transactions = [_transaction(i, self.padding) for i in ids]
+        return {
+            'result': 'success',
+            'totalresults': len(transactions),
+            'startnumber': 0,
+            'numreturned': len(transactions),
+            'transactions': {
+                'transaction': transactions,
+            },
+        }
+
+    def _handler(self):
+        fake = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                params = dict(urllib.parse.parse_qsl(
+                    self.rfile.read(length).decode()))
+                latency = fake.latency
+                if fake.offset_latency and params.get('limitstart'):
+                    latency += (
+                        fake.offset_latency * int(params['limitstart']) / 1000)
+                if latency:
+                    time.sleep(latency)
+                status, data = fake.respond(params)
+                body = b'' if data is None else json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--item-size', type=int, default=0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--offset-latency', type=float, default=0.0)
+    args = parser.parse_args()
+    fake = FakeWHMCS(
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        items=args.items,
+        item_size=args.item_size,
+        failure_rate=args.failure_rate,
+        offset_latency=args.offset_latency)
+    print(f'Serving on {fake.url}')
+    try:
+        fake.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
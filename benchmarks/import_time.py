@@ -0,0 +1,152 @@
+"""
+Benchmark of the import time of whmcspy.
+
+Every statement is run and timed in a fresh interpreter, excluding the
+startup of the interpreter. Fails when importing the package (to use its
+exceptions) imports the HTTP stack, when a usage of the package (see
+:data:`USAGES`) fails, or when an import takes longer than ``--max-ms``.
+
+Run from the repository root, for example::
+
+    python benchmarks/import_time.py --max-ms 20
+
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+STATEMENTS = {
+    'exceptions': 'import whmcspy; whmcspy.Error',
+    'api': 'import whmcspy; whmcspy.WHMCS',
+    'instance': "import whmcspy; whmcspy.WHMCS('http://localhost', '', '')",
+}
+"""
+The statements to time by name.
+"""
+
+
+USAGES = {
+    'submodule': 'import whmcspy; whmcspy.api.WHMCS; whmcspy.aio.AsyncWHMCS',
+    'star': (
+        'from whmcspy import *; '
+        'WHMCS, AsyncWHMCS, Error, MissingPermission'),
+}
+"""
+The ways of using the package which should keep working, by name.
+"""
+
+
+LAZY_MODULES = (
+    'requests',
+    'urllib3',
+    'whmcspy.api',
+    'whmcspy.aio',
+)
+"""
+The modules which shouldn't be imported to use the exceptions.
+"""
+
+
+def _run(code):
+    start = 'import time; _start = time.perf_counter()\n'
+    end = '\nprint(time.perf_counter() - _start)'
+    output = subprocess.run(
+        [sys.executable, '-c', start + code + end],
+        check=True,
+        cwd=ROOT,
+        stdout=subprocess.PIPE).stdout
+    return float(output.splitlines()[-1])
+
+
+def measure(statement, repeat):
+    """
+    Measure the time of a statement in fresh interpreters.
+
+    Args:
+        statement (str): The statement.
+        repeat (int): The number of interpreters.
+
+    Returns:
+        float: The median time in seconds.
+
+    """
+    return statistics.median(_run(statement) for _ in range(repeat))
+
+
+def lazy_modules_imported():
+    """
+    Get the lazy modules which are imported to use the exceptions.
+
+    Returns:
+        list: The imported lazy modules.
+
+    """
+    code = (
+        STATEMENTS['exceptions']
+        + '\nimport sys'
+        + f'\nprint(",".join(m for m in {LAZY_MODULES!r} '
+          'if m in sys.modules))')
+    output = subprocess.run(
+        [sys.executable, '-c', code],
+        check=True,
+        cwd=ROOT,
+        stdout=subprocess.PIPE).stdout.decode().strip()
+    return [module for module in output.split(',') if module]
+
+
+def broken_usages():
+    """
+    Get the usages (see :data:`USAGES`) which fail.
+
+    Returns:
+        list: The names of the failing usages.
+
+    """
+    return [
+        name
+        for name, code in USAGES.items()
+        if subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL).returncode
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=9)
+    parser.add_argument(
+        '--max-ms',
+        type=float,
+        help='Fail when importing the exceptions takes longer.')
+    args = parser.parse_args()
+    print(f'{"statement":<14}{"ms":>10}')
+    results = {}
+    for name, statement in STATEMENTS.items():
+        results[name] = measure(statement, args.repeat) * 1000
+        print(f'{name:<14}{results[name]:>10.1f}')
+    failed = False
+    imported = lazy_modules_imported()
+    if imported:
+        print(f'Imported to use the exceptions: {", ".join(imported)}')
+        failed = True
+    broken = broken_usages()
+    if broken:
+        print(f'Broken usages: {", ".join(broken)}')
+        failed = True
+    if args.max_ms is not None and results['exceptions'] > args.max_ms:
+        print(f'Importing the exceptions takes longer than {args.max_ms} ms')
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
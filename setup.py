@@ -23,6 +23,23 @@ setup(
     install_requires=[
         'requests >= 2.21.0',
     ],
+    extras_require={
+        'async': [
+            'httpx >= 0.18.0',
+        ],
+        'export': [
+            'pyarrow >= 7.0.0',
+        ],
+        'http2': [
+            'httpx[http2] >= 0.18.0',
+        ],
+        'json': [
+            'orjson >= 3.0.0',
+        ],
+        'stream': [
+            'ijson >= 3.1',
+        ],
+    },
     classifiers=[
         'Programming Language :: Python :: 3',
         'License :: OSI Approved :: GNU General Public License v3 (GPLv3)',
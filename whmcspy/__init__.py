@@ -1,2 +1,53 @@
-from whmcspy.api import WHMCS
+import importlib
+
 from whmcspy.exceptions import *
+
+
+__all__ = [
+    'AsyncWHMCS',
+    'Error',
+    'MissingPermission',
+    'WHMCS',
+]
+
+
+_LAZY = {
+    'AsyncWHMCS': 'whmcspy.aio',
+    'WHMCS': 'whmcspy.api',
+}
+"""
+The interfaces by module. They're imported on first access, so importing
+the package (e.g. for its exceptions) doesn't import the HTTP stack.
+"""
+
+
+_SUBMODULES = (
+    'aio',
+    'api',
+    'coalesce',
+    'decoding',
+    'encoding',
+    'pipeline',
+    'records',
+    'throttle',
+    'transport',
+)
+"""
+The submodules which are imported on first access as attributes of the
+package, like they were when the package imported the interfaces eagerly.
+"""
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY) | set(_SUBMODULES))
@@ -0,0 +1,749 @@
+import asyncio
+import collections
+
+from whmcspy import decoding
+from whmcspy import encoding
+from whmcspy import records
+from whmcspy.api import _build_payload
+from whmcspy.api import _check_page
+from whmcspy.api import _client_product_params
+from whmcspy.api import _decode_response
+from whmcspy.api import _domain_params
+from whmcspy.api import _matches
+from whmcspy.api import _order_params
+from whmcspy.api import _process_response
+from whmcspy.api import split_filters
+from whmcspy.transport import HEADERS
+
+
+async def _merge(iterables, workers, maxsize=1000):
+    """
+    Iterate over async iterables concurrently, merging their elements.
+
+    See :func:`whmcspy.api._merge`.
+
+    Args:
+        iterables: The async iterables.
+        workers (int): The number of iterables to consume concurrently.
+        maxsize (int): The maximum number of elements waiting to be yielded.
+
+    Yields:
+        The elements of the iterables.
+
+    Raises:
+        Exception: The first exception raised by an iterable.
+
+    """
+    iterables = iter(iterables)
+    queue = asyncio.Queue(maxsize)
+    done = object()
+
+    async def consume():
+        try:
+            for iterable in iterables:
+                async for element in iterable:
+                    await queue.put((element, None))
+        except Exception as error:
+            await queue.put((done, error))
+        else:
+            await queue.put((done, None))
+
+    tasks = [asyncio.ensure_future(consume()) for _ in range(workers)]
+    running = len(tasks)
+    try:
+        while running:
+            element, error = await queue.get()
+            if error is not None:
+                raise error
+            if element is done:
+                running -= 1
+                continue
+            yield element
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class AsyncWHMCS:
+    """
+    Asynchronous WHMCS interface.
+
+    The methods mirror the methods of :class:`whmcspy.api.WHMCS`, but are
+    coroutines (or asynchronous generators for paginated calls).
+
+    Note:
+        This requires httpx to be installed (``pip install whmcspy[async]``).
+
+    """
+    def __init__(
+            self,
+            url,
+            identifier,
+            secret,
+            max_connections=10,
+            max_keepalive_connections=10,
+            client=None,
+            http2=False,
+            json_backend=None):
+        """
+        Create a new instance.
+
+        Args:
+            url (str): The URL to the WHMCS api.
+            identifier (str): The identifier of the WHMCS credentials.
+            secret (str): The secret of the WHMCS credentials.
+
+        Keyword Args:
+            max_connections (int): The maximum number of concurrent
+                connections.
+            max_keepalive_connections (int): The maximum number of
+                connections to keep alive.
+            client (httpx.AsyncClient): Use this client instead of creating a
+                new one. A given client isn't closed by :func:`close`.
+            http2 (bool): Use HTTP/2 when the server supports it, this
+                requires h2 (``pip install whmcspy[http2]``).
+            json_backend: The name of the JSON backend to decode responses
+                with (see :data:`whmcspy.decoding.BACKENDS`) or a function
+                decoding bytes. Defaults to the fastest installed backend.
+
+        """
+        self.url = url
+        self.identifier = identifier
+        self.secret = secret
+        self._owns_client = client is None
+        if client is None:
+            import httpx
+            client = httpx.AsyncClient(
+                http2=http2,
+                verify=False,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_keepalive_connections))
+        self.client = client
+        self.loads = decoding.backend(json_backend)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """
+        Close the HTTP client and its pooled connections.
+
+        """
+        if self._owns_client:
+            await self.client.aclose()
+
+    async def call(
+            self,
+            action,
+            **params):
+        """
+        Call the WHMCS api.
+
+        See :func:`whmcspy.api.WHMCS.call`.
+
+        """
+        payload = _build_payload(
+            self.identifier,
+            self.secret,
+            action,
+            params)
+        response = await self.client.post(
+            self.url,
+            content=encoding.encode(payload),
+            headers=HEADERS)
+        return _process_response(
+            response.status_code,
+            _decode_response(
+                self.loads,
+                response.status_code,
+                response.content))
+
+    async def paginated_call(
+            self,
+            action,
+            limitstart=0,
+            workers=None,
+            **params):
+        """
+        Perform a WHMCS API call, but paginated.
+
+        See :func:`whmcspy.api.WHMCS.paginated_call`.
+
+        """
+        if workers:
+            async for response in self._prefetched_call(
+                    action,
+                    limitstart,
+                    workers,
+                    params):
+                yield response
+            return
+        while True:
+            params.update(
+                limitstart=limitstart,
+            )
+            response = await self.call(
+                action,
+                **params)
+            if not response['numreturned']:
+                break
+            limitstart += response['numreturned']
+            yield response
+
+    async def _prefetched_call(
+            self,
+            action,
+            limitstart,
+            workers,
+            params):
+        """
+        Perform a paginated call while fetching pages concurrently.
+
+        See :func:`whmcspy.api.WHMCS._prefetched_call`.
+
+        """
+        response = await self.call(
+            action,
+            limitstart=limitstart,
+            **params)
+        if not response['numreturned']:
+            return
+        yield response
+        step = min(
+            int(params.get('limitnum') or response['numreturned']),
+            int(response['numreturned']))
+        offsets = iter(range(
+            limitstart + response['numreturned'],
+            int(response['totalresults']),
+            step))
+
+        def fetch(offset):
+            return offset, asyncio.ensure_future(self.call(
+                action,
+                limitstart=offset,
+                **params))
+
+        pending = collections.deque()
+        for offset in offsets:
+            pending.append(fetch(offset))
+            if len(pending) == workers:
+                break
+        try:
+            while pending:
+                offset, task = pending.popleft()
+                response = await task
+                for next_offset in offsets:
+                    pending.append(fetch(next_offset))
+                    break
+                if not response['numreturned']:
+                    break
+                _check_page(response, offset, step)
+                yield response
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+    async def _filtered_items(
+            self,
+            action,
+            container,
+            item,
+            filters,
+            params):
+        """
+        Perform a paginated call yielding the items matching filters.
+
+        See :func:`whmcspy.api.WHMCS._filtered_items`.
+
+        Raises:
+            ValueError: When `stream` is passed, AsyncWHMCS doesn't decode
+                responses incrementally.
+
+        """
+        if params.pop('stream', False):
+            raise ValueError('Streaming isn\'t supported by AsyncWHMCS.')
+        partitions = params.pop('partitions', None)
+        partition_workers = params.pop('partition_workers', 8)
+        if params.pop('dedupe', False):
+            seen = set()
+            async for obj in self._filtered_items(
+                    action,
+                    container,
+                    item,
+                    filters,
+                    dict(
+                        params,
+                        partitions=partitions,
+                        partition_workers=partition_workers)):
+                if obj['id'] not in seen:
+                    seen.add(obj['id'])
+                    yield obj
+            return
+        if partitions is not None:
+            walks = []
+            for partition in partitions:
+                partition_filters = dict(filters)
+                partition_params = dict(params)
+                for key, value in partition.items():
+                    if key in filters:
+                        partition_filters[key] = value
+                    else:
+                        partition_params[key] = value
+                walks.append(self._filtered_items(
+                    action,
+                    container,
+                    item,
+                    partition_filters,
+                    partition_params))
+            async for obj in _merge(
+                    walks,
+                    min(partition_workers, len(walks)) or 1):
+                yield obj
+            return
+        record = params.pop('typed', False) and records.RECORDS[action]
+        server_params, client_filters = split_filters(action, **filters)
+        params.update(server_params)
+        async for response in self.paginated_call(
+                action,
+                **params):
+            for obj in response[container][item]:
+                if _matches(action, obj, client_filters):
+                    yield record(obj) if record else obj
+
+    async def add_client(
+            self,
+            firstname,
+            lastname,
+            email,
+            address1,
+            city,
+            state,
+            postcode,
+            country,
+            phonenumber,
+            password2,
+            **params):
+        """
+        Add client.
+
+        See :func:`whmcspy.api.WHMCS.add_client`.
+
+        """
+        result = await self.call(
+            'AddClient',
+            firstname=firstname,
+            lastname=lastname,
+            email=email,
+            address1=address1,
+            city=city,
+            state=state,
+            postcode=postcode,
+            country=country,
+            phonenumber=phonenumber,
+            password2=password2,
+            **params)
+        return result['clientid']
+
+    async def add_product(
+            self,
+            name,
+            gid,
+            **params):
+        """
+        Add product.
+
+        See :func:`whmcspy.api.WHMCS.add_product`.
+
+        """
+        result = await self.call(
+            'AddProduct',
+            name=name,
+            gid=gid,
+            **params)
+        return result['pid']
+
+    async def get_orders(
+            self,
+            active=None,
+            clientid=None,
+            status=None,
+            **params):
+        """
+        Get orders.
+
+        See :func:`whmcspy.api.WHMCS.get_orders`.
+
+        """
+        async for order in self._filtered_items(
+                'GetOrders',
+                'orders',
+                'order',
+                {
+                    'active': active,
+                    'clientid': clientid,
+                    'status': status,
+                },
+                params):
+            yield order
+
+    async def get_servers(
+            self,
+            **params):
+        """
+        Get servers configured in WHMCS.
+
+        See :func:`whmcspy.api.WHMCS.get_servers`.
+
+        """
+        response = await self.call(
+            'GetServers',
+            **params)
+        return response['servers']
+
+    async def get_tld_pricing(self):
+        """
+        Get the TLD pricing.
+
+        See :func:`whmcspy.api.WHMCS.get_tld_pricing`.
+
+        """
+        return await self.call('GetTLDPricing')
+
+    async def accept_order(
+            self,
+            order_id,
+            **params):
+        """
+        Accept an order.
+
+        See :func:`whmcspy.api.WHMCS.accept_order`.
+
+        """
+        params.update(
+            orderid=order_id,
+        )
+        return await self.call(
+            'AcceptOrder',
+            **params)
+
+    async def add_order(
+            self,
+            clientid,
+            domains=None,
+            paymentmethod='banktransfer',
+            products=None,
+            **params):
+        """
+        Add an order.
+
+        See :func:`whmcspy.api.WHMCS.add_order`.
+
+        """
+        params = _order_params(
+            clientid,
+            domains,
+            paymentmethod,
+            products,
+            params)
+        return await self.call(
+            'AddOrder',
+            **params)
+
+    async def add_transaction(
+            self,
+            paymentmethod,
+            **params):
+        """
+        Add a transaction.
+
+        See :func:`whmcspy.api.WHMCS.add_transaction`.
+
+        """
+        params.update(
+            paymentmethod=paymentmethod,
+        )
+        await self.call(
+            'AddTransaction',
+            **params)
+
+    async def cancel_order(
+            self,
+            orderid,
+            **params):
+        """
+        Cancel a pending order.
+
+        See :func:`whmcspy.api.WHMCS.cancel_order`.
+
+        """
+        params.update(
+            orderid=orderid,
+        )
+        await self.call(
+            'CancelOrder',
+            **params)
+
+    async def delete_order(
+            self,
+            orderid,
+            **params):
+        """
+        Delete a cancelled or fraud order.
+
+        See :func:`whmcspy.api.WHMCS.delete_order`.
+
+        """
+        params.update(
+            orderid=orderid,
+        )
+        await self.call(
+            'DeleteOrder',
+            **params)
+
+    async def get_clients_domains(
+            self,
+            active=None,
+            clientid=None,
+            domain=None,
+            status=None,
+            **params):
+        """
+        Get domains (registrations).
+
+        See :func:`whmcspy.api.WHMCS.get_clients_domains`.
+
+        """
+        async for domain_ in self._filtered_items(
+                'GetClientsDomains',
+                'domains',
+                'domain',
+                {
+                    'active': active,
+                    'clientid': clientid,
+                    'domain': domain,
+                    'status': status,
+                },
+                params):
+            yield domain_
+
+    async def get_clients_products(
+            self,
+            active=None,
+            productid=None,
+            clientid=None,
+            domain=None,
+            status=None,
+            **params):
+        """
+        Get client products.
+
+        See :func:`whmcspy.api.WHMCS.get_clients_products`.
+
+        """
+        async for product in self._filtered_items(
+                'GetClientsProducts',
+                'products',
+                'product',
+                {
+                    'active': active,
+                    'clientid': clientid,
+                    'domain': domain,
+                    'productid': productid or None,
+                    'status': status,
+                },
+                params):
+            yield product
+
+    async def get_invoice(
+            self,
+            invoiceid):
+        """
+        Get an invoice.
+
+        See :func:`whmcspy.api.WHMCS.get_invoice`.
+
+        """
+        return await self.call(
+            'GetInvoice',
+            invoiceid=invoiceid)
+
+    async def get_tickets(
+            self,
+            clientid=None,
+            status=None,
+            **params):
+        """
+        Get support tickets.
+
+        See :func:`whmcspy.api.WHMCS.get_tickets`.
+
+        """
+        async for ticket in self._filtered_items(
+                'GetTickets',
+                'tickets',
+                'ticket',
+                {
+                    'clientid': clientid,
+                    'status': status,
+                },
+                params):
+            yield ticket
+
+    async def get_transactions(
+            self,
+            per_client=False,
+            workers=None,
+            stream=False,
+            **params):
+        """
+        Get (find) transactions.
+
+        See :func:`whmcspy.api.WHMCS.get_transactions`.
+
+        Raises:
+            ValueError: When `stream` is passed, AsyncWHMCS doesn't decode
+                responses incrementally.
+
+        """
+        if stream:
+            raise ValueError('Streaming isn\'t supported by AsyncWHMCS.')
+        if not per_client:
+            for transaction in await self._get_transactions(params):
+                yield transaction
+            return
+        clientids = (
+            client['id']
+            async for response in self.paginated_call('GetClients')
+            for client in response['clients']['client'])
+        pending = collections.deque()
+        try:
+            async for clientid in clientids:
+                pending.append(asyncio.ensure_future(self._get_transactions(
+                    dict(params, clientid=clientid))))
+                if len(pending) < (workers or 1):
+                    continue
+                for transaction in await pending.popleft():
+                    yield transaction
+            while pending:
+                for transaction in await pending.popleft():
+                    yield transaction
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _get_transactions(
+            self,
+            params):
+        """
+        Get transactions using a single call.
+
+        Args:
+            params (dict): Additional params.
+
+        Returns:
+            list: The matching transactions.
+
+        """
+        response = await self.call(
+            'GetTransactions',
+            **params)
+        transactions = response.get('transactions') or {}
+        return transactions.get('transaction', [])
+
+    async def module_create(
+            self,
+            serviceid):
+        """
+        Run the module create action for a service.
+
+        See :func:`whmcspy.api.WHMCS.module_create`.
+
+        """
+        return await self.call(
+            'ModuleCreate',
+            serviceid=serviceid)
+
+    async def open_ticket(
+            self,
+            deptid,
+            subject,
+            message,
+            **params):
+        """
+        Open a support ticket
+
+        See :func:`whmcspy.api.WHMCS.open_ticket`.
+
+        """
+        params.update(
+            deptid=deptid,
+            subject=subject,
+            message=message,
+        )
+        await self.call(
+            'OpenTicket',
+            **params)
+
+    async def pending_order(
+            self,
+            orderid,
+            **params):
+        """
+        Set an order and it's items to Pending.
+
+        See :func:`whmcspy.api.WHMCS.pending_order`.
+
+        """
+        params.update(
+            orderid=orderid,
+        )
+        await self.call(
+            'PendingOrder',
+            **params)
+
+    async def send_email(
+            self,
+            **params):
+        """
+        Send a client email notification.
+
+        See :func:`whmcspy.api.WHMCS.send_email`.
+
+        """
+        await self.call(
+            'SendEmail',
+            **params)
+
+    async def update_client_domain(
+            self,
+            domain,
+            **params):
+        """
+        Update a client's domain registration.
+
+        See :func:`whmcspy.api.WHMCS.update_client_domain`.
+
+        """
+        params = _domain_params(domain, params)
+        return await self.call(
+            'UpdateClientDomain',
+            **params)
+
+    async def update_client_product(
+            self,
+            productid,
+            **params):
+        """
+        Update a client's product.
+
+        See :func:`whmcspy.api.WHMCS.update_client_product`.
+
+        """
+        params = _client_product_params(productid, params)
+        return await self.call(
+            'updateClientProduct',
+            **params)
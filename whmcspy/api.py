@@ -1,6 +1,21 @@
-import requests
-
+import collections
+import contextlib
+import datetime
+import itertools
+import queue
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from whmcspy import coalesce
+from whmcspy import decoding
 from whmcspy import exceptions
+from whmcspy import pipeline
+from whmcspy import records
+from whmcspy import throttle
+from whmcspy import transport as transports
 
 
 def _is_inactive(obj, active):
@@ -25,6 +40,521 @@ def _is_inactive(obj, active):
         or active is False and obj['status'] == 'Active')
 
 
+RETRY_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+"""
+HTTP status codes of responses which are retried.
+"""
+
+
+SPOOL_SIZE = 1024 * 1024
+"""
+The number of bytes of a streamed response body spooled in memory (instead
+of a temporary file) when a governor is used.
+"""
+
+
+def _retry_after(value):
+    """
+    Parse the value of a Retry-After header.
+
+    Args:
+        value (str): The header value, either a number of seconds or an HTTP
+            date.
+
+    Returns:
+        float: The number of seconds to wait or None if the value is
+        invalid.
+
+    """
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    import email.utils
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return max(0.0, (date - now).total_seconds())
+
+
+def _is_read_action(action):
+    """
+    Check if an action only reads data.
+
+    Args:
+        action (str): The action to check.
+
+    Returns:
+        True if the action is a read action (the `Get*` family).
+
+    """
+    return action[:3].lower() == 'get'
+
+
+def _build_payload(identifier, secret, action, params):
+    """
+    Build the payload of an API call.
+
+    Args:
+        identifier (str): The identifier of the WHMCS credentials.
+        secret (str): The secret of the WHMCS credentials.
+        action (str): The action to perform.
+        params (dict): Additional params. Lists and dicts are kept as is,
+            they're encoded as arrays by :func:`whmcspy.encoding.encode`.
+
+    Returns:
+        dict: The payload to post to WHMCS.
+
+    """
+    payload = {
+        'identifier': identifier,
+        'secret': secret,
+        'action': action,
+        'responsetype': 'json',
+    }
+    payload.update(params)
+    return payload
+
+
+def _decode_response(loads, status_code, content):
+    """
+    Decode the body of an API response.
+
+    Args:
+        loads (callable): The function decoding bytes.
+        status_code (int): The HTTP status code of the response.
+        content (bytes): The body.
+
+    Returns:
+        The decoded response.
+
+    Raises:
+        Error: When the body isn't JSON, e.g. an empty body or an HTML
+            error page.
+
+    """
+    try:
+        return loads(content)
+    except ValueError as e:
+        raise exceptions.Error(
+            f'Invalid response (HTTP status {status_code})') from e
+
+
+def _json_events(response):
+    """
+    Parse a streamed response incrementally.
+
+    Args:
+        response (whmcspy.transport.Response): The streamed response.
+
+    Yields:
+        tuple: The ijson events (path, event, value).
+
+    Raises:
+        Error: When the body isn't JSON.
+
+    """
+    import ijson
+    try:
+        yield from ijson.parse(response.raw, use_float=True)
+    except ijson.JSONError as e:
+        raise exceptions.Error(
+            f'Invalid response (HTTP status {response.status_code})') from e
+
+
+def _process_response(status_code, response):
+    """
+    Process a decoded API response.
+
+    Args:
+        status_code (int): The HTTP status code of the response.
+        response (dict): The decoded response.
+
+    Returns:
+        dict: The response.
+
+    Raises:
+        MissingPermission: When access is denied due to a missing
+            permission.
+        Error: Whenever the call failed, including responses with an error
+            status code or without a result.
+
+    """
+    result = None
+    if isinstance(response, dict):
+        result = response.get('result', response.get('status'))
+    if result == 'error':
+        message = response.get('message', f'HTTP status {status_code}')
+        if status_code == 403:
+            raise exceptions.MissingPermission(message)
+        raise exceptions.Error(message)
+    if result is None or status_code >= 400:
+        raise exceptions.Error(
+            f'Unexpected response (HTTP status {status_code})')
+    return response
+
+
+def _order_params(
+        clientid,
+        domains,
+        paymentmethod,
+        products,
+        params):
+    """
+    Build the params of an AddOrder call.
+
+    See :func:`WHMCS.add_order` for the arguments.
+
+    Returns:
+        dict: The params.
+
+    """
+    params.update(
+        clientid=clientid,
+        paymentmethod=paymentmethod,
+    )
+    if domains:
+        params.update(
+            domain=list(domains),
+            domaintype=['register'] * len(domains),
+            domainpriceoverride=[0] * len(domains),
+            domainrenewoverride=[0] * len(domains),
+        )
+    if products:
+        params['pid'] = [product['id'] for product in products]
+        params['domain'] = [
+            product['domain'] for product in products
+        ] + list(domains or ())[len(products):]
+    return params
+
+
+DOMAIN_FIELDS = {
+    'dnsmanagement': 'dnsmanagement',
+    'emailforwarding': 'emailforwarding',
+    'idprotection': 'idprotection',
+    'donotrenew': 'donotrenew',
+    'type': 'regtype',
+    'regdate': 'regdate',
+    'nextduedate': 'nextduedate',
+    'expirydate': 'expirydate',
+    'domain': 'domainname',
+    'firstpaymentamount': 'firstpaymentamount',
+    'recurringamount': 'recurringamount',
+    'registrar': 'registrar',
+    'regperiod': 'regperiod',
+    'paymentmethod': 'paymentmethodname',
+    'subscriptionid': 'subscriptionid',
+    'status': 'status',
+    'notes': 'notes',
+    'promoid': 'promoid',
+}
+"""
+The UpdateClientDomain params mapped to the domain fields they're taken
+from.
+"""
+
+
+_DOMAIN_PARAMS = {field: param for param, field in DOMAIN_FIELDS.items()}
+
+
+def _domain_params(domain, params):
+    """
+    Build the params of an UpdateClientDomain call.
+
+    See :func:`WHMCS.update_client_domain` for the arguments.
+
+    Returns:
+        dict: The params.
+
+    """
+    params['domainid'] = domain['id']
+    for param, field in DOMAIN_FIELDS.items():
+        params[param] = domain[field]
+    return params
+
+
+def _domain_diff(original, desired):
+    """
+    Build the params of an UpdateClientDomain call updating only changes.
+
+    Args:
+        original (dict): The domain as it is in WHMCS.
+        desired (dict): The desired domain, keyed by domain fields (see
+            :func:`WHMCS.get_clients_domains`) or UpdateClientDomain params
+            (see :data:`DOMAIN_FIELDS`). Fields which are missing are left
+            unchanged.
+
+    Returns:
+        dict: The params or None if nothing changed.
+
+    Raises:
+        ValueError: When a desired key can't be updated and differs from
+            the original.
+
+    """
+    params = {}
+    for key, value in desired.items():
+        if key in DOMAIN_FIELDS:
+            param, field = key, DOMAIN_FIELDS[key]
+        elif key in _DOMAIN_PARAMS:
+            param, field = _DOMAIN_PARAMS[key], key
+        elif key in original and str(value) == str(original[key]):
+            continue
+        else:
+            raise ValueError(f'Unsupported domain field: {key}')
+        if str(value) != str(original.get(field)):
+            params[param] = value
+    if not params:
+        return None
+    params['domainid'] = original['id']
+    return params
+
+
+def _client_product_params(productid, params):
+    """
+    Build the params of an UpdateClientProduct call.
+
+    See :func:`WHMCS.update_client_product` for the arguments.
+
+    Returns:
+        dict: The params.
+
+    """
+    params.update(
+        serviceid=productid,
+    )
+    nextduedate = params.get('nextduedate')
+    if nextduedate:
+        params['nextduedate'] = nextduedate.strftime('%Y-%m-%d')
+    return params
+
+
+FILTERS = {
+    'GetClientsDomains': {
+        'active': (None, 'status'),
+        'clientid': ('clientid', 'userid'),
+        'domain': ('domain', 'domainname'),
+        'status': (None, 'status'),
+    },
+    'GetClientsProducts': {
+        'active': (None, 'status'),
+        'clientid': ('clientid', 'clientid'),
+        'domain': ('domain', 'domain'),
+        'productid': ('pid', 'pid'),
+        'status': (None, 'status'),
+    },
+    'GetOrders': {
+        'active': ('status', 'status'),
+        'clientid': ('userid', 'userid'),
+        'status': ('status', 'status'),
+    },
+    'GetTickets': {
+        'clientid': ('clientid', 'userid'),
+        'status': ('status', 'status'),
+    },
+}
+"""
+The filters of the list actions. Every filter maps to the param used to
+filter in WHMCS (None if WHMCS doesn't support it) and the field of the
+items to filter on otherwise.
+"""
+
+
+def split_filters(action, **filters):
+    """
+    Split filters of a list action in WHMCS params and client-side filters.
+
+    Filters are pushed down to WHMCS whenever the API supports it, so
+    non-matching items aren't transferred at all. The remaining filters
+    are applied to the received items.
+
+    Args:
+        action (str): The list action, see :data:`FILTERS`.
+        **filters: The filters. Filters which are None are ignored.
+
+    Returns:
+        tuple: The params to pass to WHMCS and the filters to apply
+        client-side.
+
+    """
+    params = {}
+    client_filters = {}
+    for name, value in filters.items():
+        if value is None:
+            continue
+        param, _ = FILTERS[action][name]
+        if name == 'active':
+            if param and value is True and filters.get('status') is None:
+                params[param] = 'Active'
+            else:
+                client_filters[name] = value
+        elif param:
+            params[param] = value
+        else:
+            client_filters[name] = value
+    return params, client_filters
+
+
+def _matches(action, obj, client_filters):
+    """
+    Check if an item matches client-side filters.
+
+    Args:
+        action (str): The list action.
+        obj (dict): The item.
+        client_filters (dict): The filters, see :func:`split_filters`.
+
+    Returns:
+        True if the item matches all filters.
+
+    """
+    for name, value in client_filters.items():
+        if name == 'active':
+            if _is_inactive(obj, value):
+                return False
+        elif str(obj[FILTERS[action][name][1]]) != str(value):
+            return False
+    return True
+
+
+def _check_page(response, offset, step):
+    """
+    Check that a prefetched page isn't cut short.
+
+    Prefetched pages are requested at offsets `step` apart. A page with
+    fewer results while more results follow means results are skipped.
+
+    Args:
+        response (dict): The response of the page.
+        offset (int): The offset of the page.
+        step (int): The number of results per page.
+
+    Raises:
+        Error: When the page is cut short.
+
+    """
+    numreturned = int(response['numreturned'])
+    if (numreturned < step
+            and offset + numreturned < int(response['totalresults'])):
+        raise exceptions.Error(
+            f'Page at offset {offset} returned {numreturned} instead of '
+            f'{step} results, results would be skipped')
+
+
+def _ordered_map(function, iterable, workers):
+    """
+    Map a function over an iterable concurrently, preserving the order.
+
+    At most `workers` calls are pending ahead of the result that is being
+    yielded. Pending calls are cancelled when the generator is closed.
+
+    Args:
+        function (callable): The function to call for every element.
+        iterable: The elements.
+        workers (int): The number of concurrent calls.
+
+    Yields:
+        The results in the order of the elements.
+
+    """
+    import concurrent.futures
+    iterator = iter(iterable)
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers) as executor:
+        pending = collections.deque(
+            executor.submit(function, element)
+            for element in itertools.islice(iterator, workers))
+        try:
+            while pending:
+                result = pending.popleft().result()
+                for element in itertools.islice(iterator, 1):
+                    pending.append(executor.submit(function, element))
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _unique(items):
+    """
+    Yield only the first item per id.
+
+    Args:
+        items: The items (with an `id`).
+
+    Yields:
+        The unique items.
+
+    """
+    seen = set()
+    for obj in items:
+        id_ = obj['id']
+        if id_ not in seen:
+            seen.add(id_)
+            yield obj
+
+
+def _merge(iterables, workers, maxsize=1000):
+    """
+    Iterate over iterables concurrently, merging their elements.
+
+    Every iterable is consumed in a thread, the elements are yielded in the
+    order they arrive through a queue of at most `maxsize` elements. The
+    threads stop when the generator is closed or an iterable raises.
+
+    Args:
+        iterables (list): The iterables.
+        workers (int): The number of iterables to consume concurrently.
+        maxsize (int): The maximum number of elements buffered.
+
+    Yields:
+        The elements.
+
+    """
+    import concurrent.futures
+    elements = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(element):
+        while not stop.is_set():
+            try:
+                elements.put(element, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def consume(iterable):
+        try:
+            for element in iterable:
+                if stop.is_set():
+                    break
+                put((True, element))
+        except BaseException as e:
+            put((False, e))
+        finally:
+            getattr(iterable, 'close', lambda: None)()
+            put((False, None))
+
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers) as executor:
+        for iterable in iterables:
+            executor.submit(consume, iterable)
+        try:
+            remaining = len(iterables)
+            while remaining:
+                ok, element = elements.get()
+                if ok:
+                    yield element
+                elif element is None:
+                    remaining -= 1
+                else:
+                    raise element
+        finally:
+            stop.set()
+
+
 class WHMCS:
     """
     WHMCS interface.
@@ -34,37 +564,114 @@ class WHMCS:
             self,
             url,
             identifier,
-            secret):
+            secret,
+            pool_connections=10,
+            pool_maxsize=10,
+            pool_block=False,
+            session=None,
+            cache=None,
+            retries=0,
+            backoff_factor=0.5,
+            backoff_max=30,
+            retry_writes=False,
+            metrics=None,
+            coalesce_reads=False,
+            governor=None,
+            transport=None,
+            json_backend=None):
         """
         Create a new instance.
 
+        All calls are done using a single HTTP session, so connections to
+        WHMCS are kept alive and reused between calls. Use :func:`close` or
+        use the instance as a context manager to release the connections.
+
         Args:
             url (str): The URL to the WHMCS api.
             identifier (str): The identifier of the WHMCS credentials.
             secret (str): The secret of the WHMCS credentials.
 
+        Keyword Args:
+            pool_connections (int): The number of connection pools (hosts)
+                to cache.
+            pool_maxsize (int): The maximum number of connections to keep
+                alive per host.
+            pool_block (bool): Block when no free connection is available
+                instead of opening a connection which isn't kept.
+            session (requests.Session): Use this session instead of creating
+                a new one. A given session isn't closed by :func:`close`.
+            cache (whmcspy.cache.ResponseCache): Cache the responses of read
+                actions in this cache.
+            retries (int): The number of times to retry a call which failed
+                due to a connection error, a timeout or a server error
+                (see :data:`RETRY_STATUS_CODES`).
+            backoff_factor (float): The base delay in seconds between
+                retries. The delay doubles with every retry and is
+                randomized (jitter). A Retry-After header takes precedence.
+            backoff_max (float): The maximum delay in seconds between
+                retries. A call isn't retried when its Retry-After header
+                asks for a longer delay.
+            retry_writes (bool): Also retry actions which aren't read
+                actions. Note that this might perform an action twice.
+            metrics (whmcspy.metrics.Metrics): Record the metrics of calls
+                and paginated walks.
+            coalesce_reads (bool): Let identical concurrent calls of read
+                actions share a single request. The statistics are available
+                in :attr:`singleflight`.
+            governor (whmcspy.throttle.Governor): Limit the rate and the
+                number of calls in flight. A governor can be shared by
+                multiple instances, every attempt of a call is limited.
+            transport: The name of the transport to post the calls with
+                (see :func:`whmcspy.transport.create`), defaults to
+                ``requests``. Or the transport itself
+                (:class:`whmcspy.transport.Transport`), e.g. to record or
+                replay calls. A given transport isn't closed by
+                :func:`close` and the pool params and session are ignored.
+            json_backend: The name of the JSON backend to decode responses
+                with (see :data:`whmcspy.decoding.BACKENDS`) or a function
+                decoding bytes. Defaults to the fastest installed backend.
+
         """
         self.url = url
         self.identifier = identifier
         self.secret = secret
-
-    def _format_array_params(self, params):
+        self._owns_transport = not isinstance(
+            transport,
+            transports.Transport)
+        if self._owns_transport:
+            transport = transports.create(
+                transport or 'requests',
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+                session=session)
+        self.transport = transport
+        self.session = getattr(transport, 'session', None)
+        self.loads = decoding.backend(json_backend)
+        self.cache = cache
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.retry_writes = retry_writes
+        self.metrics = metrics
+        self.singleflight = None
+        if coalesce_reads:
+            self.singleflight = coalesce.SingleFlight()
+        self.governor = governor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
         """
-        Format lists as array params.
-
-        A list should be formatted in a certain way (PHP-ish?) in order to be
-        processable by WHMCS.
-        The params dict is modified to contain the new params.
-
-        Args:
-            params (dict): The params to process.
+        Close the HTTP session and its pooled connections.
 
         """
-        for key, value in list(params.items()):
-            if isinstance(value, list):
-                for index, item in enumerate(value):
-                    params[f'{key}[{index}]'] = item
-                del params[key]
+        if self._owns_transport:
+            self.transport.close()
 
     def call(
             self,
@@ -89,33 +696,278 @@ class WHMCS:
             Error: Whenever the call fails.
 
         """
-        payload = {
-            'identifier': self.identifier,
-            'secret': self.secret,
-            'action': action,
-            'responsetype': 'json',
-        }
-        self._format_array_params(params)
-        payload.update(params)
-        response = requests.post(
-            self.url,
-            verify=False,
-            data=payload)
-        response_ = response.json()
+        payload = _build_payload(
+            self.identifier,
+            self.secret,
+            action,
+            params)
+        if self.cache is not None:
+            return self._cached_call(action, payload)
+        return self._fetch(payload)
+
+    def _cached_call(
+            self,
+            action,
+            payload):
+        """
+        Call the WHMCS api using the cache.
+
+        Responses of read actions are taken from the cache if available.
+        Calling a mutating action invalidates the related read actions.
+
+        Args:
+            action (str): The action to perform.
+            payload (dict): The payload to post.
+
+        Returns:
+            dict: The result of the call.
+
+        """
+        if not _is_read_action(action):
+            try:
+                return self._fetch(payload)
+            finally:
+                self.cache.mutated(action)
+        scope = self.url, self.identifier
+        response = self.cache.get(action, payload, scope)
+        if response is None:
+            response = self._fetch(payload)
+            self.cache.set(action, payload, response, scope)
+        return response
+
+    def _fetch(self, payload):
+        """
+        Post a payload to WHMCS, coalescing identical read calls if enabled.
+
+        Args:
+            payload (dict): The payload to post.
+
+        Returns:
+            dict: The result of the call.
+
+        """
+        if (self.singleflight is not None
+                and _is_read_action(payload['action'])):
+            return self.singleflight.do(
+                coalesce.request_key(payload),
+                lambda: self._post(payload))
+        return self._post(payload)
+
+    def _post(self, payload):
+        """
+        Post a payload to WHMCS and process the response.
+
+        Args:
+            payload (dict): The payload to post.
+
+        Returns:
+            dict: The result of the call.
+
+        """
+        if self.metrics is not None:
+            return self._instrumented_post(payload)
+        response = self._send(payload)
+        return _process_response(
+            response.status_code,
+            _decode_response(
+                self.loads,
+                response.status_code,
+                response.content))
+
+    def _instrumented_post(self, payload):
+        """
+        Post a payload to WHMCS and record the metrics of the call.
+
+        Args:
+            payload (dict): The payload to post.
+
+        Returns:
+            dict: The result of the call.
+
+        """
+        response = error = None
+        http_time = decode_time = 0.0
+        start = time.perf_counter()
         try:
-            result = response_['result']
-        except KeyError:
-            result = response_['status']
-        if result == 'error':
-            if response.status_code == 403:
-                raise exceptions.MissingPermission(response_['message'])
-            raise exceptions.Error(response_['message'])
-        return response_
+            response = self._send(payload)
+            decode_start = time.perf_counter()
+            http_time = decode_start - start
+            response_ = _decode_response(
+                self.loads,
+                response.status_code,
+                response.content)
+            decode_time = time.perf_counter() - decode_start
+            return _process_response(
+                response.status_code,
+                response_)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if response is None:
+                http_time = time.perf_counter() - start
+                bytes_sent = bytes_received = 0
+            else:
+                bytes_sent = response.bytes_sent
+                bytes_received = response.bytes_received
+            self.metrics.record_call(
+                payload['action'],
+                bytes_sent,
+                bytes_received,
+                http_time,
+                decode_time,
+                error)
+
+    def _limit(self, read):
+        """
+        Get the context limiting a call by the governor.
+
+        Args:
+            read (bool): Whether the call is a read call.
+
+        Returns:
+            A context manager.
+
+        """
+        if self.governor is None:
+            return contextlib.nullcontext()
+        return self.governor.limit(read)
+
+    def _send(self, payload):
+        """
+        Post a payload to WHMCS, retrying if needed.
+
+        Args:
+            payload (dict): The payload to post.
+
+        Returns:
+            whmcspy.transport.Response: The response.
+
+        """
+        read = _is_read_action(payload['action'])
+        retries = self.retries
+        if not self.retry_writes and not read:
+            retries = 0
+        for attempt in itertools.count():
+            try:
+                with self._limit(read):
+                    response = self.transport.post(self.url, payload)
+            except self.transport.retry_exceptions:
+                if attempt >= retries:
+                    raise
+                self._backoff(attempt)
+                continue
+            if (response.status_code in RETRY_STATUS_CODES
+                    and attempt < retries
+                    and self._backoff(
+                        attempt,
+                        response.headers.get('retry-after'))):
+                continue
+            return response
+
+    def _open_stream(self, stack, payload):
+        """
+        Post a payload to WHMCS streaming the response, retrying if needed.
+
+        Retries happen before any of the body is read, see :func:`_send`.
+        When a governor is used the body is spooled (see
+        :data:`SPOOL_SIZE`) before the in flight slot is released, so the
+        slot isn't held while the items are consumed.
+
+        Args:
+            stack (contextlib.ExitStack): The stack to enter the stream on.
+                The stream is open until the stack is closed.
+            payload (dict): The payload to post.
+
+        Returns:
+            whmcspy.transport.Response: The streamed response.
+
+        """
+        for attempt in itertools.count():
+            with contextlib.ExitStack() as attempt_stack:
+                try:
+                    attempt_stack.enter_context(self._limit(True))
+                    response = attempt_stack.enter_context(
+                        self.transport.stream(self.url, payload))
+                except self.transport.retry_exceptions:
+                    if attempt >= self.retries:
+                        raise
+                    delay = self._delay(attempt)
+                else:
+                    delay = None
+                    if (response.status_code in RETRY_STATUS_CODES
+                            and attempt < self.retries):
+                        delay = self._delay(
+                            attempt,
+                            response.headers.get('retry-after'))
+                    if delay is None and self.governor is None:
+                        stack.enter_context(attempt_stack.pop_all())
+                        return response
+                    if delay is None:
+                        spool = stack.enter_context(
+                            tempfile.SpooledTemporaryFile(SPOOL_SIZE))
+                        shutil.copyfileobj(response.raw, spool)
+            if delay is None:
+                spool.seek(0)
+                response.raw = spool
+                return response
+            time.sleep(delay)
+
+    def _backoff(
+            self,
+            attempt,
+            retry_after=None):
+        """
+        Sleep before retrying a call.
+
+        See :func:`_delay` for the arguments.
+
+        Returns:
+            bool: Whether the call should be retried.
+
+        """
+        delay = self._delay(attempt, retry_after)
+        if delay is None:
+            return False
+        time.sleep(delay)
+        return True
+
+    def _delay(
+            self,
+            attempt,
+            retry_after=None):
+        """
+        Get the delay before retrying a call.
+
+        A Retry-After header is honored, unless it asks for a longer delay
+        than `backoff_max`. In that case the call shouldn't be retried.
+
+        Args:
+            attempt (int): The number of the failed attempt, starting at 0.
+            retry_after (str): The value of the Retry-After header of the
+                failed response.
+
+        Returns:
+            float: The delay in seconds or None if the call shouldn't be
+            retried.
+
+        """
+        delay = None
+        if retry_after:
+            delay = _retry_after(retry_after)
+        if delay is None:
+            return random.uniform(
+                0,
+                min(self.backoff_max, self.backoff_factor * 2 ** attempt))
+        if delay > self.backoff_max:
+            return None
+        return delay
 
     def paginated_call(
             self,
             action,
             limitstart=0,
+            workers=None,
             **params):
         """
         Perform a WHMCS API call, but paginated.
@@ -124,9 +976,62 @@ class WHMCS:
         every iteration until an empty result returns from WHMCS.
         See :func:`call` for common params.
 
+        A page which fails is retried (see the `retries` param of
+        :class:`WHMCS`) without restarting from the first page.
+
+        By default the pages are requested one after another. When
+        `workers` is set the `totalresults` of the first response is used to
+        request the remaining pages concurrently. The responses are still
+        yielded in order. Note that in this mode results added to WHMCS
+        during the iteration are not included. The pages are requested at
+        offsets the size of the first page apart, so a server capping the
+        page size below `limitnum` doesn't cause results to be skipped.
+
         Keyword Args:
             limitstart (int): The offset from which to start. Initially this
                 is 0.
+            workers (int): The number of pages to fetch concurrently. Make
+                sure the connection pool (`pool_maxsize`) is large enough.
+            limitnum (int): The number of results per page.
+
+        Yields:
+            An API response.
+
+        """
+        if workers:
+            pages = self._prefetched_call(
+                action,
+                limitstart,
+                workers,
+                params)
+        else:
+            pages = self._serial_call(
+                action,
+                limitstart,
+                params)
+        if self.metrics is None:
+            yield from pages
+            return
+        count = 0
+        try:
+            for response in pages:
+                count += 1
+                yield response
+        finally:
+            self.metrics.record_walk(action, count)
+
+    def _serial_call(
+            self,
+            action,
+            limitstart,
+            params):
+        """
+        Perform a paginated call fetching one page after another.
+
+        Args:
+            action (str): The action to perform.
+            limitstart (int): The offset from which to start.
+            params (dict): Additional params.
 
         Yields:
             An API response.
@@ -144,6 +1049,408 @@ class WHMCS:
             limitstart += response['numreturned']
             yield response
 
+    def _prefetched_call(
+            self,
+            action,
+            limitstart,
+            workers,
+            params):
+        """
+        Perform a paginated call while fetching pages concurrently.
+
+        At most `workers` pages are requested ahead of the page that is being
+        yielded. The pages are requested at offsets the size of the first
+        page apart (at most `limitnum`).
+
+        Args:
+            action (str): The action to perform.
+            limitstart (int): The offset from which to start.
+            workers (int): The number of pages to fetch concurrently.
+            params (dict): Additional params.
+
+        Yields:
+            An API response.
+
+        Raises:
+            Error: When a page is cut short, see :func:`_check_page`.
+
+        """
+        response = self.call(
+            action,
+            limitstart=limitstart,
+            **params)
+        if not response['numreturned']:
+            return
+        yield response
+        step = min(
+            int(params.get('limitnum') or response['numreturned']),
+            int(response['numreturned']))
+        offsets = range(
+            limitstart + response['numreturned'],
+            int(response['totalresults']),
+            step)
+        responses = _ordered_map(
+            lambda offset: self.call(
+                action,
+                limitstart=offset,
+                **params),
+            offsets,
+            workers)
+        with contextlib.closing(responses):
+            for offset, response in zip(offsets, responses):
+                if not response['numreturned']:
+                    break
+                _check_page(response, offset, step)
+                yield response
+
+    def paginated_items(
+            self,
+            action,
+            container,
+            item,
+            stream=False,
+            **params):
+        """
+        Perform a paginated WHMCS API call and yield the listed items.
+
+        Responses of list actions contain the items in a nested list, for
+        example ``response['orders']['order']``.
+        See :func:`paginated_call` for common params.
+
+        In streaming mode the responses are decoded incrementally and every
+        item is yielded as soon as it's decoded, so only a single item is
+        held in memory instead of a whole page.
+
+        Args:
+            action (str): The action to perform.
+            container (str): The key containing the items, e.g. `orders`.
+            item (str): The key of the item list, e.g. `order`.
+            **params: Additional params.
+
+        Keyword Args:
+            stream (bool): Decode the responses incrementally. This requires
+                ijson to be installed (``pip install whmcspy[stream]``) and
+                can't be combined with `workers`.
+
+        Yields:
+            The items.
+
+        """
+        if stream:
+            items = self._streamed_items(
+                action,
+                container,
+                item,
+                params)
+        else:
+            items = (
+                obj
+                for response in self.paginated_call(
+                    action,
+                    **params)
+                for obj in response[container][item])
+        if self.metrics is None:
+            yield from items
+            return
+        count = 0
+        try:
+            for obj in items:
+                count += 1
+                yield obj
+        finally:
+            self.metrics.record_items(action, count)
+
+    def _filtered_items(
+            self,
+            action,
+            container,
+            item,
+            filters,
+            params):
+        """
+        Perform a paginated call yielding the items matching filters.
+
+        The filters are pushed down to WHMCS where possible, see
+        :func:`split_filters`.
+
+        Args:
+            action (str): The list action.
+            container (str): The key containing the items.
+            item (str): The key of the item list.
+            filters (dict): The filters.
+            params (dict): Additional params. If it contains a true `typed`
+                the items are yielded as records, see
+                :mod:`whmcspy.records`. If it contains `partitions` the
+                partitions are walked concurrently (see
+                :func:`WHMCS.get_orders`), if it contains a true `dedupe`
+                only the first item per id is yielded.
+
+        Yields:
+            The matching items.
+
+        """
+        partitions = params.pop('partitions', None)
+        partition_workers = params.pop('partition_workers', 8)
+        if params.pop('dedupe', False):
+            yield from _unique(self._filtered_items(
+                action,
+                container,
+                item,
+                filters,
+                dict(
+                    params,
+                    partitions=partitions,
+                    partition_workers=partition_workers)))
+            return
+        if partitions is not None:
+            walks = []
+            for partition in partitions:
+                partition_filters = dict(filters)
+                partition_params = dict(params)
+                for key, value in partition.items():
+                    if key in filters:
+                        partition_filters[key] = value
+                    else:
+                        partition_params[key] = value
+                walks.append(self._filtered_items(
+                    action,
+                    container,
+                    item,
+                    partition_filters,
+                    partition_params))
+            yield from _merge(
+                walks,
+                min(partition_workers, len(walks)) or 1)
+            return
+        record = params.pop('typed', False) and records.RECORDS[action]
+        server_params, client_filters = split_filters(action, **filters)
+        params.update(server_params)
+        items = self.paginated_items(
+            action,
+            container,
+            item,
+            **params)
+        if client_filters:
+            items = (
+                obj
+                for obj in items
+                if _matches(action, obj, client_filters))
+        if record:
+            items = map(record, items)
+        yield from items
+
+    def _streamed_items(
+            self,
+            action,
+            container,
+            item,
+            params):
+        """
+        Perform a paginated call decoding the responses incrementally.
+
+        See :func:`paginated_items` for the arguments.
+
+        Yields:
+            The items.
+
+        """
+        if params.get('workers'):
+            raise ValueError('Streaming can\'t be combined with workers.')
+        limitstart = params.pop('limitstart', 0)
+        pages = 0
+        try:
+            while True:
+                numreturned = 0
+                for obj in self._streamed_call(
+                        action,
+                        f'{container}.{item}.item',
+                        limitstart=limitstart,
+                        **params):
+                    numreturned += 1
+                    yield obj
+                if not numreturned:
+                    break
+                pages += 1
+                limitstart += numreturned
+        finally:
+            if self.metrics is not None:
+                self.metrics.record_walk(action, pages)
+
+    def _streamed_call(
+            self,
+            action,
+            prefix,
+            **params):
+        """
+        Call the WHMCS api and decode the response incrementally.
+
+        Args:
+            action (str): The action to perform.
+            prefix (str): The ijson prefix of the items to yield.
+            **params: Additional params.
+
+        Yields:
+            The items at the prefix.
+
+        Raises:
+            MissingPermission: When access is denied due to a missing
+                permission.
+            Error: Whenever the call fails.
+
+        """
+        import ijson
+        payload = _build_payload(
+            self.identifier,
+            self.secret,
+            action,
+            params)
+        response_ = {}
+        response = error = None
+        http_time = yielded_time = 0.0
+        start = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                response = self._open_stream(stack, payload)
+                http_time = time.perf_counter() - start
+                if response.status_code >= 400:
+                    _process_response(
+                        response.status_code,
+                        _decode_response(
+                            self.loads,
+                            response.status_code,
+                            response.raw.read()))
+                builder = None
+                for path, event, value in _json_events(response):
+                    if builder is not None:
+                        builder.event(event, value)
+                        if path == prefix and event == 'end_map':
+                            yield_start = time.perf_counter()
+                            yield builder.value
+                            yielded_time += time.perf_counter() - yield_start
+                            builder = None
+                    elif path == prefix and event == 'start_map':
+                        builder = ijson.ObjectBuilder()
+                        builder.event(event, value)
+                    elif '.' not in path and event in (
+                            'string', 'number', 'boolean', 'null'):
+                        response_[path] = value
+            _process_response(
+                response.status_code,
+                response_)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if self.metrics is not None:
+                if response is None:
+                    http_time = time.perf_counter() - start
+                    decode_time = 0.0
+                    bytes_sent = bytes_received = 0
+                else:
+                    decode_time = (
+                        time.perf_counter() - start - http_time
+                        - yielded_time)
+                    bytes_sent = response.bytes_sent
+                    bytes_received = response.bytes_received
+                self.metrics.record_call(
+                    action,
+                    bytes_sent,
+                    bytes_received,
+                    http_time,
+                    decode_time,
+                    error)
+
+    def batch(
+            self,
+            calls,
+            workers=8,
+            rate=None,
+            keyed=False):
+        """
+        Perform many independent calls concurrently.
+
+        Every call is either an action with its params, for example
+        ``('GetInvoice', {'invoiceid': 1})``, or a method with its params,
+        for example ``(whmcs.module_create, {'serviceid': 2})``.
+        Results are yielded as soon as they are available, so not
+        necessarily in the original order. A failing call doesn't abort the
+        batch, instead the error is yielded as its result.
+
+        The calls are consumed lazily, at most ``workers * 2`` calls are
+        pending at a time.
+
+        Args:
+            calls: A dict of keys with calls or an iterable of calls. When
+                an iterable is given the index of the call is used as key,
+                unless `keyed` is true.
+
+        Keyword Args:
+            workers (int): The number of calls to perform concurrently.
+            rate (float): The maximum number of calls to start per second.
+            keyed (bool): The iterable of calls is an iterable of tuples of
+                a key and a call.
+
+        Yields:
+            tuple: The key and the result of a call. The result is an
+            :class:`~whmcspy.exceptions.Error` if the call failed.
+
+        """
+        import concurrent.futures
+        if isinstance(calls, dict):
+            calls = calls.items()
+        elif not keyed:
+            calls = enumerate(calls)
+        limiter = rate and throttle.RateLimiter(rate)
+
+        def perform(action, params):
+            if limiter:
+                limiter.acquire()
+            if callable(action):
+                return action(**params)
+            return self.call(action, **params)
+
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=workers) as executor:
+            pending = {}
+            try:
+                for key, (action, params) in calls:
+                    if len(pending) >= workers * 2:
+                        yield from self._batch_results(pending)
+                    future = executor.submit(perform, action, dict(params))
+                    pending[future] = key
+                while pending:
+                    yield from self._batch_results(pending)
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def _batch_results(self, pending):
+        """
+        Wait for at least one of the pending batch calls to complete.
+
+        Args:
+            pending (dict): The pending futures with their keys. Completed
+                futures are removed.
+
+        Yields:
+            tuple: The key and the result of a completed call.
+
+        """
+        import concurrent.futures
+        done, _ = concurrent.futures.wait(
+            pending,
+            return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            key = pending.pop(future)
+            try:
+                result = future.result()
+            except exceptions.Error as e:
+                result = e
+            except Exception as e:
+                result = exceptions.Error(str(e))
+                result.__cause__ = e
+            yield key, result
+
     def add_client(
             self,
             firstname,
@@ -226,13 +1533,40 @@ class WHMCS:
 
     def get_orders(
             self,
+            active=None,
+            clientid=None,
+            status=None,
             **params):
         """
         Get orders.
 
+        The filters are applied by WHMCS where possible, see
+        :func:`split_filters`.
+
         Args:
             **params: Additional params.
 
+        Keyword Args:
+            active (bool): Filter on active or inactive orders.
+            clientid (int): Only get orders of this client.
+            status (str): Only get orders with this status.
+            stream (bool): Decode the responses incrementally, see
+                :func:`paginated_items`.
+            typed (bool): Yield compact typed records instead of dicts, see
+                :mod:`whmcspy.records`.
+            partitions (list): Split the walk into partitions, every
+                partition is a dict of filters and params, e.g.
+                ``[{'status': 'Active'}, {'status': 'Pending'}]``. The
+                partitions are walked concurrently with shallow offsets and
+                the orders are yielded in the order they arrive. Partition
+                by filters which WHMCS applies (see :func:`split_filters`),
+                other filters are applied after fetching every order of the
+                partition.
+            partition_workers (int): The number of partitions to walk
+                concurrently.
+            dedupe (bool): Only yield the first order per id, e.g. when
+                partitions overlap. The ids are kept in memory.
+
         Yields:
             The matching orders.
 
@@ -241,11 +1575,16 @@ class WHMCS:
             https://developers.whmcs.com/api-reference/getorders/
 
         """
-        for response in self.paginated_call(
-                'GetOrders',
-                **params):
-            for order in response['orders']['order']:
-                yield order
+        yield from self._filtered_items(
+            'GetOrders',
+            'orders',
+            'order',
+            {
+                'active': active,
+                'clientid': clientid,
+                'status': status,
+            },
+            params)
 
     def get_servers(
             self,
@@ -328,20 +1667,12 @@ class WHMCS:
             https://developers.whmcs.com/api-reference/addorder/
 
         """
-        params.update(
-            clientid=clientid,
-            paymentmethod=paymentmethod,
-        )
-        if domains:
-            for i, domain in enumerate(domains):
-                params[f'domain[{i}]'] = domain
-                params[f'domaintype[{i}]'] = 'register'
-                params[f'domainpriceoverride[{i}]'] = 0
-                params[f'domainrenewoverride[{i}]'] = 0
-        if products:
-            for i, product in enumerate(products):
-                params[f'pid[{i}]'] = product['id']
-                params[f'domain[{i}]'] = product['domain']
+        params = _order_params(
+            clientid,
+            domains,
+            paymentmethod,
+            products,
+            params)
         response = self.call(
             'AddOrder',
             **params)
@@ -415,15 +1746,28 @@ class WHMCS:
     def get_clients_domains(
             self,
             active=None,
+            clientid=None,
+            domain=None,
+            status=None,
             **params):
         """
         Get domains (registrations).
 
+        The filters are applied by WHMCS where possible, see
+        :func:`split_filters`.
+
         Args:
             **params: Additional params.
 
         Keyword Args:
             active (bool): Filter on active or inactive domains.
+            clientid (int): Only get domains of this client.
+            domain (str): Only get domains with this domain name.
+            status (str): Only get domains with this status.
+            stream (bool): Decode the responses incrementally, see
+                :func:`paginated_items`.
+            typed (bool): Yield compact typed records instead of dicts, see
+                :mod:`whmcspy.records`.
 
         Yields:
             The domains.
@@ -433,29 +1777,50 @@ class WHMCS:
             https://developers.whmcs.com/api-reference/getclientsdomains/
 
         """
-        for response in self.paginated_call(
-                'GetClientsDomains',
-                **params):
-            for domain in response['domains']['domain']:
-                if _is_inactive(domain, active):
-                    continue
-                yield domain
+        yield from self._filtered_items(
+            'GetClientsDomains',
+            'domains',
+            'domain',
+            {
+                'active': active,
+                'clientid': clientid,
+                'domain': domain,
+                'status': status,
+            },
+            params)
 
     def get_clients_products(
             self,
             active=None,
             productid=None,
+            clientid=None,
+            domain=None,
+            status=None,
             **params):
         """
         Get client products.
 
+        The filters are applied by WHMCS where possible, see
+        :func:`split_filters`.
 
         Args:
             **params: Additional params.
 
         Keyword Args:
-            active (bool): Filter on active or inactive domains.
+            active (bool): Filter on active or inactive products.
             productid (int): Only get products with this product id.
+            clientid (int): Only get products of this client.
+            domain (str): Only get products with this domain name.
+            status (str): Only get products with this status.
+            stream (bool): Decode the responses incrementally, see
+                :func:`paginated_items`.
+            typed (bool): Yield compact typed records instead of dicts, see
+                :mod:`whmcspy.records`.
+            partitions (list): Split the walk into partitions walked
+                concurrently, see :func:`get_orders`.
+            partition_workers (int): The number of partitions to walk
+                concurrently.
+            dedupe (bool): Only yield the first product per id.
 
         Yields:
             The products.
@@ -465,15 +1830,18 @@ class WHMCS:
             https://developers.whmcs.com/api-reference/getclientsproducts/
 
         """
-        if productid:
-            params['pid'] = productid
-        for response in self.paginated_call(
-                'GetClientsProducts',
-                **params):
-            for product in response['products']['product']:
-                if _is_inactive(product, active):
-                    continue
-                yield product
+        yield from self._filtered_items(
+            'GetClientsProducts',
+            'products',
+            'product',
+            {
+                'active': active,
+                'clientid': clientid,
+                'domain': domain,
+                'productid': productid or None,
+                'status': status,
+            },
+            params)
 
     def get_invoice(
             self,
@@ -495,13 +1863,30 @@ class WHMCS:
 
     def get_tickets(
             self,
+            clientid=None,
+            status=None,
             **params):
         """
         Get support tickets.
 
+        The filters are applied by WHMCS, see :func:`split_filters`.
+
         Args:
             **params: Additional params.
 
+        Keyword Args:
+            clientid (int): Only get tickets of this client.
+            status (str): Only get tickets with this status.
+            stream (bool): Decode the responses incrementally, see
+                :func:`paginated_items`.
+            typed (bool): Yield compact typed records instead of dicts, see
+                :mod:`whmcspy.records`.
+            partitions (list): Split the walk into partitions walked
+                concurrently, see :func:`get_orders`.
+            partition_workers (int): The number of partitions to walk
+                concurrently.
+            dedupe (bool): Only yield the first ticket per id.
+
         Yields:
             The tickets.
 
@@ -510,33 +1895,101 @@ class WHMCS:
             https://developers.whmcs.com/api-reference/gettickets/
 
         """
-        for response in self.paginated_call(
-                'GetTickets',
-                **params):
-            for ticket in response['tickets']['ticket']:
-                yield ticket
+        yield from self._filtered_items(
+            'GetTickets',
+            'tickets',
+            'ticket',
+            {
+                'clientid': clientid,
+                'status': status,
+            },
+            params)
 
     def get_transactions(
             self,
+            per_client=False,
+            workers=None,
+            stream=False,
             **params):
         """
         Get (find) transactions.
 
+        WHMCS doesn't paginate transactions, all matching transactions are
+        returned in a single response. To keep memory usage bounded the
+        response can be decoded incrementally (`stream`), or the
+        transactions can be fetched per client (`per_client`).
+
         Args:
             **params: Additional params.
 
-        Returns:
-            A list of matching transactions.
+        Keyword Args:
+            per_client (bool): Fetch the transactions of every client
+                separately. Note that transactions which aren't linked to a
+                client are skipped.
+            workers (int): The number of clients to fetch transactions for
+                concurrently when fetching per client.
+            stream (bool): Decode the responses incrementally. This requires
+                ijson to be installed (``pip install whmcspy[stream]``).
+
+        Yields:
+            The matching transactions.
 
         Hint:
             For additional params, see the official API docs:
             https://developers.whmcs.com/api-reference/gettransactions/
 
         """
+        if not per_client:
+            yield from self._get_transactions(stream, params)
+            return
+        clientids = (
+            client['id']
+            for client in self.paginated_items(
+                'GetClients',
+                'clients',
+                'client'))
+        if not workers:
+            for clientid in clientids:
+                yield from self._get_transactions(
+                    stream,
+                    dict(params, clientid=clientid))
+            return
+        transactions = _ordered_map(
+            lambda clientid: list(self._get_transactions(
+                False,
+                dict(params, clientid=clientid))),
+            clientids,
+            workers)
+        with contextlib.closing(transactions):
+            for transactions_ in transactions:
+                yield from transactions_
+
+    def _get_transactions(
+            self,
+            stream,
+            params):
+        """
+        Get transactions using a single call.
+
+        Args:
+            stream (bool): Decode the response incrementally.
+            params (dict): Additional params.
+
+        Yields:
+            The matching transactions.
+
+        """
+        if stream:
+            yield from self._streamed_call(
+                'GetTransactions',
+                'transactions.transaction.item',
+                **params)
+            return
         response = self.call(
             'GetTransactions',
             **params)
-        return response.get('transactions', {}).get('transaction', [])
+        transactions = response.get('transactions') or {}
+        yield from transactions.get('transaction', [])
 
     def module_create(
             self,
@@ -553,6 +2006,26 @@ class WHMCS:
             serviceid=serviceid)
         return result
 
+    def onboard(
+            self,
+            specs,
+            workers=4,
+            rate=None,
+            checkpoint=None):
+        """
+        Onboard many customers: add clients and orders, accept the orders
+        and create the services.
+
+        See :func:`whmcspy.pipeline.onboard`.
+
+        """
+        return pipeline.onboard(
+            self,
+            specs,
+            workers=workers,
+            rate=rate,
+            checkpoint=checkpoint)
+
     def open_ticket(
             self,
             deptid,
@@ -639,32 +2112,71 @@ class WHMCS:
             https://developers.whmcs.com/api-reference/updateclientdomain/
 
         """
-        params.update(
-            domainid=domain['id'],
-            dnsmanagement=domain['dnsmanagement'],
-            emailforwarding=domain['emailforwarding'],
-            idprotection=domain['idprotection'],
-            donotrenew=domain['donotrenew'],
-            type=domain['regtype'],
-            regdate=domain['regdate'],
-            nextduedate=domain['nextduedate'],
-            expirydate=domain['expirydate'],
-            domain=domain['domainname'],
-            firstpaymentamount=domain['firstpaymentamount'],
-            recurringamount=domain['recurringamount'],
-            registrar=domain['registrar'],
-            regperiod=domain['regperiod'],
-            paymentmethod=domain['paymentmethodname'],
-            subscriptionid=domain['subscriptionid'],
-            status=domain['status'],
-            notes=domain['notes'],
-            promoid=domain['promoid'],
-        )
+        params = _domain_params(domain, params)
         response = self.call(
             'UpdateClientDomain',
             **params)
         return response
 
+    def update_client_domains(
+            self,
+            changes,
+            workers=8,
+            rate=None):
+        """
+        Update many domain registrations, sending only the changed fields.
+
+        Every change is a tuple of the domain as it is in WHMCS (e.g. from
+        :func:`get_clients_domains`) and the desired domain. Only the fields
+        which differ are sent, changes without differences are skipped
+        without calling WHMCS. The changes are consumed lazily and the
+        updates are performed concurrently, see :func:`batch`.
+
+        Args:
+            changes: An iterable of tuples of the original and the desired
+                domain (dict). The desired domain may contain only the
+                fields to change, keyed by domain fields or
+                UpdateClientDomain params (see :data:`DOMAIN_FIELDS`).
+
+        Keyword Args:
+            workers (int): The number of updates to perform concurrently.
+            rate (float): The maximum number of updates to start per second.
+
+        Yields:
+            tuple: The domain id and the result of the update. The result is
+            None if the update was skipped and an
+            :class:`~whmcspy.exceptions.Error` if the update failed.
+
+        Raises:
+            ValueError: When a domain occurs more than once, or a desired
+                field can't be updated.
+
+        """
+        skipped = collections.deque()
+        seen = set()
+
+        def calls():
+            for original, desired in changes:
+                if original['id'] in seen:
+                    raise ValueError(f'Duplicate domain: {original["id"]}')
+                seen.add(original['id'])
+                params = _domain_diff(original, desired)
+                if params is None:
+                    skipped.append(original['id'])
+                else:
+                    yield original['id'], ('UpdateClientDomain', params)
+
+        for result in self.batch(
+                calls(),
+                workers=workers,
+                rate=rate,
+                keyed=True):
+            while skipped:
+                yield skipped.popleft(), None
+            yield result
+        while skipped:
+            yield skipped.popleft(), None
+
     def update_client_product(
             self,
             productid,
@@ -681,12 +2193,7 @@ class WHMCS:
             https://developers.whmcs.com/api-reference/updateclientproduct/
 
         """
-        params.update(
-            serviceid=productid,
-        )
-        nextduedate = params.get('nextduedate')
-        if nextduedate:
-            nextduedate = nextduedate.strftime('%Y-%m-%d')
+        params = _client_product_params(productid, params)
         response = self.call(
             'updateClientProduct',
             **params)
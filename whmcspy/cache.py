@@ -0,0 +1,214 @@
+import collections
+import threading
+import time
+
+from whmcspy import coalesce
+
+
+DEFAULT_TTLS = {
+    'GetCurrencies': 3600,
+    'GetPaymentMethods': 3600,
+    'GetProducts': 3600,
+    'GetServers': 3600,
+    'GetTLDPricing': 3600,
+}
+"""
+The default time to live (in seconds) per action.
+"""
+
+
+RELATED_ACTIONS = {
+    'AcceptOrder': (
+        'GetClientsDomains',
+        'GetClientsProducts',
+        'GetOrders',
+    ),
+    'AddClient': (
+        'GetClients',
+    ),
+    'AddOrder': (
+        'GetClientsDomains',
+        'GetClientsProducts',
+        'GetInvoice',
+        'GetInvoices',
+        'GetOrders',
+    ),
+    'AddProduct': (
+        'GetProducts',
+    ),
+    'AddTransaction': (
+        'GetInvoice',
+        'GetInvoices',
+        'GetTransactions',
+    ),
+    'CancelOrder': (
+        'GetOrders',
+    ),
+    'DeleteOrder': (
+        'GetOrders',
+    ),
+    'ModuleCreate': (
+        'GetClientsProducts',
+    ),
+    'OpenTicket': (
+        'GetTickets',
+    ),
+    'PendingOrder': (
+        'GetOrders',
+    ),
+    'UpdateClientDomain': (
+        'GetClientsDomains',
+    ),
+    'UpdateClientProduct': (
+        'GetClientsProducts',
+    ),
+}
+"""
+The read actions of which the cached responses are invalidated by a
+mutating action.
+"""
+
+
+class ResponseCache:
+    """
+    A size bounded cache of API responses.
+
+    Responses are cached per action, params and scope (the installation and
+    credentials of the client). Only actions with a time to live are cached.
+    When the cache is full the least recently used response is evicted.
+
+    Note:
+        Cached responses are shared, they shouldn't be modified.
+
+    """
+    def __init__(
+            self,
+            ttls=None,
+            maxsize=1024,
+            invalidate_related=True):
+        """
+        Create a new instance.
+
+        Keyword Args:
+            ttls (dict): The time to live (in seconds) per action. Defaults
+                to :data:`DEFAULT_TTLS`.
+            maxsize (int): The maximum number of cached responses.
+            invalidate_related (bool): Invalidate the cached responses
+                related to a mutating action when it's called (see
+                :data:`RELATED_ACTIONS`).
+
+        """
+        if ttls is None:
+            ttls = DEFAULT_TTLS
+        self.ttls = {
+            action.lower(): ttl
+            for action, ttl in ttls.items()
+        }
+        self.maxsize = maxsize
+        self.invalidate_related = invalidate_related
+        self._related = {
+            action.lower(): tuple(related.lower() for related in actions)
+            for action, actions in RELATED_ACTIONS.items()
+        }
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def ttl(self, action):
+        """
+        Get the time to live of an action.
+
+        Args:
+            action (str): The action.
+
+        Returns:
+            float: The time to live in seconds or None if the action isn't
+            cached.
+
+        """
+        return self.ttls.get(action.lower())
+
+    def get(self, action, payload, scope=None):
+        """
+        Get a cached response.
+
+        Args:
+            action (str): The action.
+            payload (dict): The payload of the call.
+            scope (tuple): Identifies the installation and credentials of the
+                call, e.g. the url and identifier. Responses are only shared
+                within a scope.
+
+        Returns:
+            dict: The cached response or None if there is no (valid)
+            response cached.
+
+        """
+        key = coalesce.request_key(payload) + (scope,)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, response = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def set(self, action, payload, response, scope=None):
+        """
+        Cache a response.
+
+        The response isn't cached if the action has no time to live.
+
+        Args:
+            action (str): The action.
+            payload (dict): The payload of the call.
+            response (dict): The response to cache.
+            scope (tuple): Identifies the installation and credentials of the
+                call (see :meth:`get`).
+
+        """
+        ttl = self.ttl(action)
+        if ttl is None:
+            return
+        key = coalesce.request_key(payload) + (scope,)
+        with self._lock:
+            self._entries[key] = time.monotonic() + ttl, response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, action=None):
+        """
+        Invalidate cached responses.
+
+        Args:
+            action (str): Only invalidate the responses of this action. If
+                not given all responses are invalidated.
+
+        """
+        with self._lock:
+            if action is None:
+                self._entries.clear()
+                return
+            action = action.lower()
+            for key in list(self._entries):
+                if key[0] == action:
+                    del self._entries[key]
+
+    def mutated(self, action):
+        """
+        Process a call of a mutating action.
+
+        When `invalidate_related` is enabled the related read actions are
+        invalidated.
+
+        Args:
+            action (str): The mutating action.
+
+        """
+        if not self.invalidate_related:
+            return
+        for related in self._related.get(action.lower(), ()):
+            self.invalidate(related)
@@ -0,0 +1,102 @@
+import threading
+
+
+def request_key(payload):
+    """
+    Get a key identifying a request.
+
+    Requests with the same action and params (in any order) have the same
+    key. The credentials aren't part of the key.
+
+    Args:
+        payload (dict): The payload of the request.
+
+    Returns:
+        tuple: The key.
+
+    """
+    params = tuple(sorted(
+        (key, str(value))
+        for key, value in payload.items()
+        if key not in ('action', 'identifier', 'secret')))
+    return payload['action'].lower(), params
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Deduplication of identical concurrent calls.
+
+    While a call is in flight, identical calls wait for it and share its
+    result (or exception) instead of being performed themselves.
+
+    """
+    def __init__(self):
+        """
+        Create a new instance.
+
+        """
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    @property
+    def stats(self):
+        """
+        dict: The number of performed `calls` and the number of calls which
+        were `coalesced` with a call in flight.
+
+        """
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'coalesced': self.coalesced,
+            }
+
+    def do(self, key, function):
+        """
+        Perform a call unless an identical call is in flight.
+
+        Args:
+            key: The key identifying the call.
+            function (callable): The function performing the call.
+
+        Returns:
+            The result of the call.
+
+        Raises:
+            Exception: The exception raised by the call.
+
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
@@ -0,0 +1,89 @@
+import codecs
+import functools
+import importlib
+
+
+BACKENDS = (
+    'orjson',
+    'ujson',
+    'json',
+)
+"""
+The JSON backends, fastest first. The standard library `json` is always
+available.
+"""
+
+
+_default = None
+
+
+def _without_bom(loads):
+    """
+    Wrap a decode function to skip a leading UTF-8 byte order mark.
+
+    Some WHMCS installs send one, not every backend accepts it.
+
+    Args:
+        loads (callable): The function decoding bytes.
+
+    Returns:
+        callable: The wrapped function.
+
+    """
+    @functools.wraps(loads)
+    def decode(data):
+        if data[:3] == codecs.BOM_UTF8:
+            data = data[3:]
+        return loads(data)
+    return decode
+
+
+def backend(name=None):
+    """
+    Get the decode function of a JSON backend.
+
+    The backends decode straight from bytes, without decoding them to text
+    first. A leading UTF-8 byte order mark is skipped.
+
+    Args:
+        name: The name of the backend (see :data:`BACKENDS`) or a function
+            decoding bytes. If not given the fastest installed backend is
+            selected.
+
+    Returns:
+        callable: The function decoding bytes.
+
+    Raises:
+        ImportError: When the backend isn't installed.
+
+    """
+    global _default
+    if callable(name):
+        return _without_bom(name)
+    if name is not None:
+        return _without_bom(importlib.import_module(name).loads)
+    if _default is None:
+        for name in BACKENDS:
+            try:
+                _default = backend(name)
+            except ImportError:
+                continue
+            break
+    return _default
+
+
+def loads(data):
+    """
+    Decode JSON using the fastest installed backend.
+
+    Args:
+        data (bytes): The JSON.
+
+    Returns:
+        The decoded value.
+
+    Raises:
+        ValueError: When the data isn't valid JSON.
+
+    """
+    return backend()(data)
@@ -0,0 +1,54 @@
+import urllib.parse
+
+
+CONTENT_TYPE = 'application/x-www-form-urlencoded'
+"""
+The content type of an encoded payload.
+"""
+
+
+_quote = urllib.parse.quote_plus
+
+
+def encode(params):
+    """
+    Encode params as an urlencoded form body in a single pass.
+
+    Lists, tuples and dicts are encoded as (nested) PHP-style arrays, e.g.
+    ``{'pid': [1, 2]}`` as ``pid[0]=1&pid[1]=2`` and
+    ``{'pricing': {'USD': {'monthly': 1}}}`` as
+    ``pricing[USD][monthly]=1`` (with the brackets urlencoded). Params with
+    a None value are left out. The params aren't modified.
+
+    Args:
+        params (dict): The params to encode.
+
+    Returns:
+        bytes: The encoded body.
+
+    """
+    parts = []
+    append = parts.append
+
+    def add(key, value):
+        # The key is already quoted.
+        if value is None:
+            return
+        if isinstance(value, str):
+            append(f'{key}={_quote(value)}')
+        elif isinstance(value, int):
+            append(f'{key}={value}')
+        elif isinstance(value, (list, tuple)):
+            for index, item in enumerate(value):
+                add(f'{key}%5B{index}%5D', item)
+        elif isinstance(value, dict):
+            for sub, item in value.items():
+                add(f'{key}%5B{_quote(str(sub))}%5D', item)
+        elif isinstance(value, bytes):
+            append(f'{key}={_quote(value)}')
+        else:
+            append(f'{key}={_quote(str(value))}')
+
+    for key, value in params.items():
+        add(_quote(str(key)), value)
+    return '&'.join(parts).encode('ascii')
@@ -0,0 +1,175 @@
+import csv
+import itertools
+import json
+import os
+
+
+FORMATS = {
+    '.arrow': 'arrow',
+    '.csv': 'csv',
+    '.feather': 'arrow',
+    '.parquet': 'parquet',
+}
+"""
+The export formats by file extension.
+"""
+
+
+def _flatten(obj, columns, strings=()):
+    """
+    Convert an item to a row.
+
+    Nested values (dicts and lists) are encoded as JSON.
+
+    Args:
+        obj (dict): The item.
+        columns (list): The columns of the row.
+        strings (set): The columns of which the other values (except None)
+            are converted to strings.
+
+    Returns:
+        dict: The row.
+
+    """
+    row = {}
+    for column in columns:
+        value = obj.get(column)
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value, separators=(',', ':'))
+        elif (column in strings
+                and value is not None
+                and not isinstance(value, str)):
+            value = str(value)
+        row[column] = value
+    return row
+
+
+def _batches(items, batch_size):
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _columns(batch):
+    columns = {}
+    for obj in batch:
+        columns.update(dict.fromkeys(obj))
+    return list(columns)
+
+
+def export(
+        items,
+        path,
+        format=None,
+        batch_size=10000,
+        schema=None):
+    """
+    Export items to a file in batches.
+
+    The items are consumed in batches of `batch_size`, so memory usage
+    doesn't depend on the number of items when they're streamed, for
+    example from :func:`whmcspy.api.WHMCS.get_orders`. The columns are
+    inferred from the first batch, fields which don't appear in the first
+    batch are ignored. For Arrow formats the inferred columns are typed as
+    strings, since WHMCS returns the same field as a number, an empty string
+    or null depending on the item. Values of string columns are converted
+    to strings.
+
+    A file is written even when there are no items: an empty CSV file, or
+    an Arrow or Parquet file with the given `schema`. Without a schema
+    there are no columns to infer, so the Arrow or Parquet file has an
+    empty schema.
+
+    Args:
+        items: An iterable of items (dicts), e.g. a paginated `get_*`
+            method.
+        path (str): The path of the file to write.
+
+    Keyword Args:
+        format (str): The format to write: `csv`, `parquet` or `arrow`
+            (Arrow IPC). Defaults to the format matching the extension of
+            the path.
+        batch_size (int): The number of items per batch.
+        schema (pyarrow.Schema): The schema to use instead of inferring it.
+
+    Returns:
+        int: The number of exported items.
+
+    Note:
+        The Parquet and Arrow formats require pyarrow to be installed
+        (``pip install whmcspy[export]``).
+
+    """
+    if format is None:
+        format = FORMATS[os.path.splitext(path)[1].lower()]
+    batches = _batches(
+        (getattr(obj, 'raw', obj) for obj in items),
+        batch_size)
+    if format == 'csv':
+        return _export_csv(batches, path)
+    if format in ('arrow', 'parquet'):
+        return _export_arrow(batches, path, format, schema)
+    raise ValueError(f'Unsupported format: {format}')
+
+
+def _export_csv(batches, path):
+    count = 0
+    with open(path, 'w', newline='') as f:
+        writer = None
+        for batch in batches:
+            if writer is None:
+                columns = _columns(batch)
+                writer = csv.DictWriter(f, columns)
+                writer.writeheader()
+            writer.writerows(_flatten(obj, columns) for obj in batch)
+            count += len(batch)
+    return count
+
+
+def _export_arrow(batches, path, format, schema):
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    def open_writer(schema):
+        if format == 'parquet':
+            return pyarrow.parquet.ParquetWriter(path, schema)
+        return pyarrow.ipc.new_file(path, schema)
+
+    count = 0
+    writer = strings = None
+    if schema is not None:
+        writer = open_writer(schema)
+    try:
+        for batch in batches:
+            if schema is None:
+                schema = pyarrow.schema(
+                    (column, pyarrow.string())
+                    for column in _columns(batch))
+            if writer is None:
+                writer = open_writer(schema)
+            if strings is None:
+                strings = {
+                    field.name
+                    for field in schema
+                    if pyarrow.types.is_string(field.type)
+                    or pyarrow.types.is_large_string(field.type)
+                }
+            rows = [_flatten(obj, schema.names, strings) for obj in batch]
+            record_batch = pyarrow.RecordBatch.from_pylist(
+                rows,
+                schema=schema)
+            if format == 'parquet':
+                writer.write_batch(record_batch)
+            else:
+                writer.write(record_batch)
+            count += len(batch)
+        if writer is None:
+            writer = open_writer(pyarrow.schema([]))
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
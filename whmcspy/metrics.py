@@ -0,0 +1,206 @@
+import bisect
+import copy
+import threading
+
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+"""
+The default upper bounds (in seconds) of the latency histogram buckets.
+"""
+
+
+class Metrics:
+    """
+    Per action metrics of WHMCS calls.
+
+    Pass an instance to :class:`whmcspy.api.WHMCS` to record the metrics of
+    its calls. The metrics can be read using :func:`snapshot`, or forwarded
+    to for example Prometheus or StatsD using hooks.
+
+    A hook is a callable which is called with an event name, the action and
+    a dict of values:
+
+    - ``call``: After every call, with the `bytes_sent`, `bytes_received`,
+      `http_time`, `decode_time`, `latency` and `error` (the exception class
+      name or None).
+    - ``walk``: After every paginated walk, with the number of `pages`
+      fetched.
+    - ``items``: After iterating over the items of a paginated walk, with the
+      number of `items` yielded.
+
+    """
+    def __init__(
+            self,
+            buckets=DEFAULT_BUCKETS):
+        """
+        Create a new instance.
+
+        Keyword Args:
+            buckets (tuple): The sorted upper bounds (in seconds) of the
+                latency histogram buckets.
+
+        """
+        self.buckets = tuple(buckets)
+        self.hooks = []
+        self._lock = threading.Lock()
+        self.reset()
+
+    def add_hook(self, hook):
+        """
+        Add a hook.
+
+        Args:
+            hook (callable): The hook to call on every event.
+
+        """
+        self.hooks.append(hook)
+
+    def reset(self):
+        """
+        Reset all metrics.
+
+        """
+        with self._lock:
+            self._actions = {}
+            self._walks = {}
+
+    def _emit(self, event, action, values):
+        for hook in self.hooks:
+            hook(event, action, values)
+
+    def _walk_stats(self, action):
+        try:
+            return self._walks[action]
+        except KeyError:
+            stats = self._walks[action] = {
+                'walks': 0,
+                'pages': 0,
+                'items': 0,
+            }
+            return stats
+
+    def record_call(
+            self,
+            action,
+            bytes_sent,
+            bytes_received,
+            http_time,
+            decode_time,
+            error=None):
+        """
+        Record a call.
+
+        Args:
+            action (str): The action of the call.
+            bytes_sent (int): The size of the request body.
+            bytes_received (int): The size of the response body.
+            http_time (float): The time in seconds spent on the HTTP request.
+            decode_time (float): The time in seconds spent decoding the
+                response.
+            error (Exception): The exception raised by the call, if any.
+
+        """
+        latency = http_time + decode_time
+        error = error and type(error).__name__
+        with self._lock:
+            try:
+                stats = self._actions[action]
+            except KeyError:
+                stats = self._actions[action] = {
+                    'requests': 0,
+                    'bytes_sent': 0,
+                    'bytes_received': 0,
+                    'http_time': 0.0,
+                    'decode_time': 0.0,
+                    'errors': {},
+                    'latency': [0] * (len(self.buckets) + 1),
+                }
+            stats['requests'] += 1
+            stats['bytes_sent'] += bytes_sent
+            stats['bytes_received'] += bytes_received
+            stats['http_time'] += http_time
+            stats['decode_time'] += decode_time
+            if error:
+                stats['errors'][error] = stats['errors'].get(error, 0) + 1
+            stats['latency'][bisect.bisect_left(self.buckets, latency)] += 1
+        if self.hooks:
+            self._emit('call', action, {
+                'bytes_sent': bytes_sent,
+                'bytes_received': bytes_received,
+                'http_time': http_time,
+                'decode_time': decode_time,
+                'latency': latency,
+                'error': error,
+            })
+
+    def record_walk(
+            self,
+            action,
+            pages):
+        """
+        Record a paginated walk.
+
+        Args:
+            action (str): The action of the walk.
+            pages (int): The number of pages fetched.
+
+        """
+        with self._lock:
+            stats = self._walk_stats(action)
+            stats['walks'] += 1
+            stats['pages'] += pages
+        if self.hooks:
+            self._emit('walk', action, {'pages': pages})
+
+    def record_items(
+            self,
+            action,
+            items):
+        """
+        Record the items yielded by a paginated walk.
+
+        Args:
+            action (str): The action of the walk.
+            items (int): The number of items yielded.
+
+        """
+        with self._lock:
+            self._walk_stats(action)['items'] += items
+        if self.hooks:
+            self._emit('items', action, {'items': items})
+
+    def snapshot(self):
+        """
+        Get a snapshot of the metrics.
+
+        Returns:
+            dict: The metrics with an `actions` key containing the call
+            metrics per action and a `walks` key containing the paginated
+            walk metrics per action. The `latency` of an action is a list of
+            ``(upper bound, count)`` tuples, the last bound is None
+            (infinite).
+
+        """
+        with self._lock:
+            actions = copy.deepcopy(self._actions)
+            walks = copy.deepcopy(self._walks)
+        for stats in actions.values():
+            stats['latency'] = list(zip(
+                self.buckets + (None,),
+                stats['latency']))
+        return {
+            'actions': actions,
+            'walks': walks,
+        }
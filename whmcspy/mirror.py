@@ -0,0 +1,363 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+TABLES = {
+    'domains': {
+        'method': 'get_clients_domains',
+        'columns': {
+            'clientid': ('userid', 'INTEGER'),
+            'status': ('status', 'TEXT'),
+            'domain': ('domainname', 'TEXT'),
+            'nextduedate': ('nextduedate', 'TEXT'),
+            'expirydate': ('expirydate', 'TEXT'),
+        },
+    },
+    'products': {
+        'method': 'get_clients_products',
+        'columns': {
+            'clientid': ('clientid', 'INTEGER'),
+            'productid': ('pid', 'INTEGER'),
+            'status': ('status', 'TEXT'),
+            'domain': ('domain', 'TEXT'),
+            'nextduedate': ('nextduedate', 'TEXT'),
+        },
+    },
+}
+"""
+The mirrored entities. Every entity maps to the :class:`whmcspy.api.WHMCS`
+method listing them and the indexed columns with the fields they're taken
+from and their types.
+"""
+
+
+def _column_value(column, value):
+    """
+    Get the value of an indexed column.
+
+    The empty dates of WHMCS (an empty string or ``0000-00-00``) are stored
+    as NULL, as text they would sort before every real date.
+
+    """
+    if column.endswith('date') and (
+            not value or str(value).startswith('0000')):
+        return None
+    return value
+
+
+class Mirror:
+    """
+    A local read-through mirror of WHMCS domains and client products.
+
+    The records are stored in a SQLite database with indexes on the
+    client, status, product, domain name and due dates, so lookups don't
+    need a paginated walk through WHMCS.
+    An entity is refreshed from WHMCS when it's queried and its data is
+    older than `max_age`, and optionally in the background every
+    `refresh_interval` seconds. While an entity is refreshed queries are
+    answered from the previous data.
+
+    """
+    def __init__(
+            self,
+            whmcs,
+            path,
+            max_age=3600,
+            refresh_interval=None,
+            **params):
+        """
+        Create a new instance.
+
+        Args:
+            whmcs (whmcspy.api.WHMCS): The WHMCS interface.
+            path (str): The path of the SQLite database. It's created if it
+                doesn't exist.
+            **params: Additional params for the listing methods, for
+                example `workers`.
+
+        Keyword Args:
+            max_age (float): The maximum age in seconds of the mirrored data.
+                If None the data is only refreshed using :func:`refresh` or
+                in the background.
+            refresh_interval (float): Refresh every entity in a background
+                thread every this many seconds, until the mirror is closed.
+                A failing background refresh keeps the previous data.
+
+        """
+        self.whmcs = whmcs
+        self.path = path
+        self.max_age = max_age
+        self.params = params
+        self.connection = sqlite3.connect(
+            path,
+            check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        self._refresh_locks = {
+            entity: threading.Lock()
+            for entity in TABLES
+        }
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        with self.connection:
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS refreshes (
+                    entity TEXT PRIMARY KEY,
+                    refreshed REAL NOT NULL
+                )
+            ''')
+            for entity, table in TABLES.items():
+                self._create_table(self.connection, entity)
+                for column in table['columns']:
+                    self.connection.execute(f'''
+                        CREATE INDEX IF NOT EXISTS {entity}_{column}
+                        ON {entity} ({column})
+                    ''')
+        self._stopped = threading.Event()
+        self._scheduler = None
+        if refresh_interval is not None:
+            self._scheduler = threading.Thread(
+                target=self._schedule,
+                args=(refresh_interval,),
+                daemon=True)
+            self._scheduler.start()
+
+    @staticmethod
+    def _create_table(connection, entity, name=None):
+        columns = ''.join(
+            f', {column} {type_}'
+            for column, (_, type_) in TABLES[entity]['columns'].items())
+        connection.execute(f'''
+            CREATE TABLE IF NOT EXISTS {name or entity} (
+                id INTEGER PRIMARY KEY{columns},
+                data TEXT NOT NULL
+            )
+        ''')
+
+    def _schedule(self, interval):
+        while not self._stopped.wait(interval):
+            for entity in TABLES:
+                try:
+                    self.refresh(entity)
+                except Exception:
+                    pass
+
+    def close(self):
+        """
+        Stop the background refreshes and close the database.
+
+        """
+        self._stopped.set()
+        if self._scheduler is not None:
+            self._scheduler.join()
+        with self._lock:
+            self.connection.close()
+
+    def refreshed(self, entity):
+        """
+        Get the time of the last refresh of an entity.
+
+        Args:
+            entity (str): The entity, see :data:`TABLES`.
+
+        Returns:
+            float: The time of the last refresh (epoch) or None if the
+            entity hasn't been refreshed yet.
+
+        """
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT refreshed FROM refreshes WHERE entity = ?',
+                (entity,)).fetchone()
+        return row and row[0]
+
+    def refresh(self, entity=None):
+        """
+        Refresh the mirrored data from WHMCS.
+
+        The records are fetched into a staging table first and then swapped
+        in using a single short transaction, so queries aren't blocked
+        during the walk through WHMCS and never see a partially refreshed
+        entity. Concurrent refreshes of an entity are performed one at a
+        time.
+
+        Args:
+            entity (str): The entity to refresh, see :data:`TABLES`. If not
+                given all entities are refreshed.
+
+        """
+        if entity is None:
+            for entity in TABLES:
+                self.refresh(entity)
+            return
+        with self._refresh_locks[entity]:
+            self._refresh(entity)
+
+    def _refresh(self, entity):
+        table = TABLES[entity]
+        columns = table['columns']
+        staging = f'{entity}_staging'
+        placeholders = ', '.join('?' * (len(columns) + 2))
+        records = (
+            getattr(record, 'raw', record)
+            for record in getattr(self.whmcs, table['method'])(**self.params))
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                self._create_table(connection, entity, staging)
+                connection.execute(f'DELETE FROM {staging}')
+                connection.executemany(
+                    f'INSERT INTO {staging} '
+                    f'(id, {", ".join(columns)}, data) '
+                    f'VALUES ({placeholders})',
+                    (
+                        (
+                            record['id'],
+                            *(
+                                _column_value(column, record.get(field))
+                                for column, (field, _) in columns.items()),
+                            json.dumps(record),
+                        )
+                        for record in records
+                    ))
+            with connection:
+                connection.execute(f'DELETE FROM {entity}')
+                connection.execute(
+                    f'INSERT INTO {entity} SELECT * FROM {staging}')
+                connection.execute(f'DELETE FROM {staging}')
+                connection.execute(
+                    'INSERT OR REPLACE INTO refreshes (entity, refreshed) '
+                    'VALUES (?, ?)',
+                    (entity, time.time()))
+        finally:
+            connection.close()
+
+    def _query(
+            self,
+            entity,
+            active=None,
+            due_before=None,
+            due_after=None,
+            expires_before=None,
+            **filters):
+        """
+        Query mirrored records, refreshing them first if needed.
+
+        See :func:`domains` for the arguments. When the data is too old
+        and another thread is already refreshing it, the previous data is
+        queried instead of waiting for the refresh.
+
+        Returns:
+            list: The matching records.
+
+        """
+        refreshed = self.refreshed(entity)
+        if refreshed is None or (
+                self.max_age is not None
+                and refreshed + self.max_age < time.time()):
+            lock = self._refresh_locks[entity]
+            if lock.acquire(blocking=refreshed is None):
+                try:
+                    if self.refreshed(entity) == refreshed:
+                        self._refresh(entity)
+                finally:
+                    lock.release()
+        clauses = []
+        values = []
+        for column, value in filters.items():
+            if value is not None:
+                clauses.append(f'{column} = ?')
+                values.append(value)
+        if active is True:
+            clauses.append('status = \'Active\'')
+        elif active is False:
+            clauses.append('status != \'Active\'')
+        for clause, value in (
+                ('nextduedate < ?', due_before),
+                ('nextduedate >= ?', due_after),
+                ('expirydate < ?', expires_before)):
+            if value is not None:
+                clauses.append(clause)
+                values.append(str(value))
+        where = ' AND '.join(clauses) or '1'
+        with self._lock:
+            rows = self.connection.execute(
+                f'SELECT data FROM {entity} WHERE {where} ORDER BY id',
+                values).fetchall()
+        return [json.loads(row['data']) for row in rows]
+
+    def domains(
+            self,
+            active=None,
+            clientid=None,
+            status=None,
+            domain=None,
+            due_before=None,
+            due_after=None,
+            expires_before=None):
+        """
+        Find mirrored domains.
+
+        Keyword Args:
+            active (bool): Filter on active or inactive domains.
+            clientid (int): Only get domains of this client.
+            status (str): Only get domains with this status.
+            domain (str): Only get domains with this domain name.
+            due_before (datetime.date): Only get domains with a next due
+                date before this date.
+            due_after (datetime.date): Only get domains with a next due date
+                on or after this date.
+            expires_before (datetime.date): Only get domains expiring
+                before this date.
+
+        Returns:
+            list: The matching domains.
+
+        """
+        return self._query(
+            'domains',
+            active=active,
+            clientid=clientid,
+            status=status,
+            domain=domain,
+            due_before=due_before,
+            due_after=due_after,
+            expires_before=expires_before)
+
+    def products(
+            self,
+            active=None,
+            clientid=None,
+            productid=None,
+            status=None,
+            domain=None,
+            due_before=None,
+            due_after=None):
+        """
+        Find mirrored client products.
+
+        Keyword Args:
+            active (bool): Filter on active or inactive products.
+            clientid (int): Only get products of this client.
+            productid (int): Only get products with this product id.
+            status (str): Only get products with this status.
+            domain (str): Only get products with this domain name.
+            due_before (datetime.date): Only get products with a next due
+                date before this date.
+            due_after (datetime.date): Only get products with a next due
+                date on or after this date.
+
+        Returns:
+            list: The matching products.
+
+        """
+        return self._query(
+            'products',
+            active=active,
+            clientid=clientid,
+            productid=productid,
+            status=status,
+            domain=domain,
+            due_before=due_before,
+            due_after=due_after)
@@ -0,0 +1,250 @@
+import json
+import os
+import threading
+import time
+
+
+STAGES = (
+    'add_client',
+    'add_order',
+    'accept_order',
+    'module_create',
+)
+"""
+The stages of onboarding a customer, in order. The module create stage is
+recorded per service as ``module_create:<serviceid>``.
+"""
+
+
+class Checkpoint:
+    """
+    A file recording the completed stages of an onboarding batch.
+
+    Every completed stage is appended as a JSON line, so a partially
+    completed batch can be resumed.
+
+    """
+    def __init__(self, path):
+        """
+        Create a new instance.
+
+        The completed stages are loaded if the file exists.
+
+        Args:
+            path (str): The path of the checkpoint file.
+
+        """
+        self.path = path
+        self.completed = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    self.completed.setdefault(
+                        entry['key'],
+                        {})[entry['stage']] = entry['result']
+
+    def get(self, key, stage):
+        """
+        Get the result of a completed stage.
+
+        Args:
+            key (str): The key of the customer.
+            stage (str): The stage.
+
+        Returns:
+            The result of the stage or None if it hasn't been completed.
+
+        """
+        return self.completed.get(key, {}).get(stage)
+
+    def record(self, key, stage, result):
+        """
+        Record a completed stage.
+
+        Args:
+            key (str): The key of the customer.
+            stage (str): The stage.
+            result: The (JSON serializable) result of the stage.
+
+        """
+        line = json.dumps({
+            'key': key,
+            'stage': stage,
+            'result': result,
+        })
+        with self._lock:
+            self.completed.setdefault(key, {})[stage] = result
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+
+
+def _serviceids(response):
+    """
+    Get the ids of the services created by an order.
+
+    Args:
+        response (dict): The AddOrder response.
+
+    Returns:
+        list: The service ids.
+
+    """
+    return [
+        int(serviceid)
+        for serviceid in str(response.get('serviceids') or '').split(',')
+        if serviceid
+    ]
+
+
+def _onboard(whmcs, spec, checkpoint):
+    """
+    Onboard a single customer.
+
+    See :func:`onboard`.
+
+    Returns:
+        dict: The result.
+
+    """
+    key = spec['key']
+    result = {
+        'key': key,
+        'clientid': spec.get('clientid'),
+        'orderid': None,
+        'serviceids': [],
+        'timings': {},
+        'failed_stage': None,
+        'error': None,
+    }
+
+    def run(stage, function):
+        done = checkpoint and checkpoint.get(key, stage)
+        if done is not None:
+            return done
+        start = time.perf_counter()
+        try:
+            value = function()
+        finally:
+            result['timings'][stage] = time.perf_counter() - start
+        if checkpoint:
+            checkpoint.record(key, stage, value)
+        return value
+
+    stage = None
+    try:
+        if result['clientid'] is None:
+            stage = 'add_client'
+            result['clientid'] = run(
+                stage,
+                lambda: whmcs.add_client(**spec['client']))
+        if 'order' not in spec:
+            return result
+
+        def add_order():
+            response = whmcs.add_order(
+                result['clientid'],
+                **spec['order'])
+            return {
+                'orderid': response['orderid'],
+                'serviceids': _serviceids(response),
+            }
+
+        stage = 'add_order'
+        order = run(stage, add_order)
+        result['orderid'] = order['orderid']
+        result['serviceids'] = order['serviceids']
+        if spec.get('accept', True):
+            stage = 'accept_order'
+            run(
+                stage,
+                lambda: bool(whmcs.accept_order(result['orderid'])))
+        if spec.get('module_create', True):
+            stage = 'module_create'
+            for serviceid in result['serviceids']:
+                run(
+                    f'{stage}:{serviceid}',
+                    lambda: bool(whmcs.module_create(serviceid)))
+    except Exception as e:
+        result['failed_stage'] = stage
+        result['error'] = e
+    return result
+
+
+def onboard(
+        whmcs,
+        specs,
+        workers=4,
+        rate=None,
+        checkpoint=None):
+    """
+    Onboard many customers.
+
+    Every customer is onboarded in stages (see :data:`STAGES`): the client
+    is added, an order is added for the client, the order is accepted and
+    the module create action is run for every ordered service. The stages
+    of a customer are performed in order, but customers are onboarded
+    concurrently.
+
+    A customer spec is a dict with:
+
+    - ``key``: A unique key (str or int) of the customer.
+    - ``client``: The params of :func:`whmcspy.api.WHMCS.add_client`, or
+      ``clientid``: the id of an existing client.
+    - ``order`` (optional): The params of
+      :func:`whmcspy.api.WHMCS.add_order` (except for the client id).
+    - ``accept`` (optional): Accept the order, defaults to True.
+    - ``module_create`` (optional): Run module create for the services,
+      defaults to True.
+
+    Args:
+        whmcs (whmcspy.api.WHMCS): The WHMCS interface.
+        specs: An iterable of customer specs.
+
+    Keyword Args:
+        workers (int): The number of customers to onboard concurrently.
+        rate (float): The maximum number of customers to start onboarding
+            per second.
+        checkpoint (str): The path of a checkpoint file. Completed stages
+            are recorded in it and skipped when resuming the batch using the
+            same file.
+
+    Yields:
+        dict: The result of every customer as soon as it's completed, with
+        the `key`, `clientid`, `orderid`, `serviceids`, the `timings` of the
+        performed stages in seconds, and the `failed_stage` and `error` if
+        onboarding failed.
+
+    Raises:
+        ValueError: When a key occurs more than once. The specs are
+            consumed lazily, so customers before the duplicate may have
+            been onboarded already.
+
+    """
+    if checkpoint is not None:
+        checkpoint = Checkpoint(checkpoint)
+    keys = set()
+
+    def calls():
+        for spec in specs:
+            if spec['key'] in keys:
+                raise ValueError(f'Duplicate customer key: {spec["key"]}')
+            keys.add(spec['key'])
+            yield spec['key'], (
+                _onboard,
+                {
+                    'whmcs': whmcs,
+                    'spec': spec,
+                    'checkpoint': checkpoint,
+                },
+            )
+
+    for _, result in whmcs.batch(
+            calls(),
+            workers=workers,
+            rate=rate,
+            keyed=True):
+        yield result
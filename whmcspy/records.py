@@ -0,0 +1,187 @@
+import datetime
+import decimal
+import json
+import sys
+import zlib
+
+
+def _int(value):
+    if value in (None, ''):
+        return None
+    return int(value)
+
+
+def _decimal(value):
+    if value in (None, ''):
+        return None
+    return decimal.Decimal(str(value))
+
+
+def _str(value):
+    if value is None:
+        return None
+    return str(value)
+
+
+def _date(value):
+    if not value or value.startswith('0000'):
+        return None
+    return datetime.date.fromisoformat(value[:10])
+
+
+def _datetime(value):
+    if not value or value.startswith('0000'):
+        return None
+    return datetime.datetime.fromisoformat(value)
+
+
+def _intern(value):
+    if value is None:
+        return None
+    return sys.intern(str(value))
+
+
+class Record:
+    """
+    A compact typed WHMCS record.
+
+    Only the fields listed in `FIELDS` are kept as (parsed) attributes.
+    Statuses and other repetitive strings are interned. The complete
+    original item is kept compressed and is decoded on access of
+    :attr:`raw`.
+
+    """
+    __slots__ = ('_raw',)
+
+    FIELDS = {}
+    """
+    The fields of the record mapped to the functions parsing them.
+    """
+
+    def __init__(self, data):
+        """
+        Create a new instance.
+
+        Args:
+            data (dict): The item as returned by WHMCS.
+
+        """
+        for name, parse in self.FIELDS.items():
+            setattr(self, name, parse(data.get(name)))
+        self._raw = zlib.compress(json.dumps(
+            data,
+            separators=(',', ':')).encode())
+
+    @property
+    def raw(self):
+        """
+        dict: The item as returned by WHMCS.
+
+        """
+        return json.loads(zlib.decompress(self._raw))
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        return self.raw[key]
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {self.id}>'
+
+
+class ClientProduct(Record):
+    """
+    A client product (service).
+
+    """
+    FIELDS = {
+        'id': _int,
+        'clientid': _int,
+        'orderid': _int,
+        'pid': _int,
+        'regdate': _date,
+        'name': _intern,
+        'domain': _str,
+        'serverid': _int,
+        'firstpaymentamount': _decimal,
+        'recurringamount': _decimal,
+        'paymentmethod': _intern,
+        'billingcycle': _intern,
+        'nextduedate': _date,
+        'status': _intern,
+    }
+    __slots__ = tuple(FIELDS)
+
+
+class Domain(Record):
+    """
+    A domain registration.
+
+    """
+    FIELDS = {
+        'id': _int,
+        'userid': _int,
+        'orderid': _int,
+        'regtype': _intern,
+        'domainname': _str,
+        'registrar': _intern,
+        'regperiod': _int,
+        'firstpaymentamount': _decimal,
+        'recurringamount': _decimal,
+        'paymentmethod': _intern,
+        'regdate': _date,
+        'expirydate': _date,
+        'nextduedate': _date,
+        'status': _intern,
+    }
+    __slots__ = tuple(FIELDS)
+
+
+class Order(Record):
+    """
+    An order.
+
+    """
+    FIELDS = {
+        'id': _int,
+        'ordernum': _int,
+        'userid': _int,
+        'date': _datetime,
+        'amount': _decimal,
+        'paymentmethod': _intern,
+        'invoiceid': _int,
+        'status': _intern,
+        'paymentstatus': _intern,
+    }
+    __slots__ = tuple(FIELDS)
+
+
+class Ticket(Record):
+    """
+    A support ticket.
+
+    """
+    FIELDS = {
+        'id': _int,
+        'tid': _str,
+        'deptid': _int,
+        'userid': _int,
+        'email': _str,
+        'date': _datetime,
+        'subject': _str,
+        'status': _intern,
+        'priority': _intern,
+        'lastreply': _datetime,
+    }
+    __slots__ = tuple(FIELDS)
+
+
+RECORDS = {
+    'GetClientsDomains': Domain,
+    'GetClientsProducts': ClientProduct,
+    'GetOrders': Order,
+    'GetTickets': Ticket,
+}
+"""
+The record class per list action.
+"""
@@ -0,0 +1,294 @@
+import hashlib
+import json
+import sqlite3
+import threading
+
+
+ENTITIES = {
+    'clients_products': ('get_clients_products', None),
+    'orders': ('get_orders', 'id'),
+    'tickets': ('get_tickets', 'lastreply'),
+}
+"""
+The entities which can be synced. Every entity maps to the name of the
+:class:`whmcspy.api.WHMCS` method listing them and the field on which WHMCS
+sorts them in descending order (None if there is no such order).
+"""
+
+
+def _hash(record):
+    """
+    Calculate the content hash of a record.
+
+    Typed records (see :mod:`whmcspy.records`) are hashed by their original
+    item.
+
+    Args:
+        record: The record (dict or :class:`whmcspy.records.Record`).
+
+    Returns:
+        str: The hash.
+
+    """
+    data = json.dumps(
+        getattr(record, 'raw', record),
+        sort_keys=True,
+        separators=(',', ':'),
+        default=str)
+    return hashlib.blake2b(data.encode(), digest_size=16).hexdigest()
+
+
+def _watermark_key(value):
+    """
+    Get a comparable key of a watermark value.
+
+    Numeric values (ids) are compared as numbers, others (dates) as
+    strings.
+
+    """
+    try:
+        return 0, int(value)
+    except (TypeError, ValueError):
+        return 1, str(value)
+
+
+class SyncStore:
+    """
+    A SQLite store of the sync state.
+
+    It contains the content hash of every synced record and the watermark of
+    every entity.
+
+    """
+    def __init__(self, path):
+        """
+        Create a new instance.
+
+        Args:
+            path (str): The path of the SQLite database. It's created if it
+                doesn't exist.
+
+        """
+        self.connection = sqlite3.connect(
+            path,
+            check_same_thread=False)
+        self.lock = threading.RLock()
+        with self.connection:
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS records (
+                    entity TEXT NOT NULL,
+                    id TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    PRIMARY KEY (entity, id)
+                ) WITHOUT ROWID
+            ''')
+            self.connection.execute('''
+                CREATE TABLE IF NOT EXISTS cursors (
+                    entity TEXT PRIMARY KEY,
+                    watermark TEXT
+                )
+            ''')
+
+    def close(self):
+        """
+        Close the database.
+
+        """
+        self.connection.close()
+
+    def get_hash(self, entity, id_):
+        """
+        Get the stored hash of a record.
+
+        Args:
+            entity (str): The entity.
+            id_: The id of the record.
+
+        Returns:
+            str: The hash or None if the record hasn't been synced before.
+
+        """
+        row = self.connection.execute(
+            'SELECT hash FROM records WHERE entity = ? AND id = ?',
+            (entity, str(id_))).fetchone()
+        return row and row[0]
+
+    def set_hashes(self, entity, hashes):
+        """
+        Store the hashes of records.
+
+        Args:
+            entity (str): The entity.
+            hashes (dict): The hashes by record id.
+
+        """
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO records (entity, id, hash) '
+            'VALUES (?, ?, ?)',
+            (
+                (entity, str(id_), hash_)
+                for id_, hash_ in hashes.items()
+            ))
+
+    def get_watermark(self, entity):
+        """
+        Get the watermark of an entity.
+
+        Args:
+            entity (str): The entity.
+
+        Returns:
+            str: The highest value of the sort field seen or None.
+
+        """
+        row = self.connection.execute(
+            'SELECT watermark FROM cursors WHERE entity = ?',
+            (entity,)).fetchone()
+        return row and row[0]
+
+    def set_watermark(self, entity, watermark):
+        """
+        Store the watermark of an entity.
+
+        Args:
+            entity (str): The entity.
+            watermark (str): The highest value of the sort field seen.
+
+        """
+        self.connection.execute(
+            'INSERT OR REPLACE INTO cursors (entity, watermark) '
+            'VALUES (?, ?)',
+            (entity, watermark))
+
+    def reset(self, entity=None):
+        """
+        Remove the sync state.
+
+        Args:
+            entity (str): Only remove the state of this entity. If not given
+                all state is removed.
+
+        """
+        with self.lock, self.connection:
+            if entity is None:
+                self.connection.execute('DELETE FROM records')
+                self.connection.execute('DELETE FROM cursors')
+            else:
+                self.connection.execute(
+                    'DELETE FROM records WHERE entity = ?',
+                    (entity,))
+                self.connection.execute(
+                    'DELETE FROM cursors WHERE entity = ?',
+                    (entity,))
+
+
+class IncrementalSync:
+    """
+    Incremental sync of WHMCS records.
+
+    Only records which are new or changed since the previous sync are
+    yielded. Changes are detected using a content hash per record which is
+    kept in a :class:`SyncStore`.
+
+    The state is only stored after a sync has been iterated completely, so
+    records of an interrupted sync are yielded again by the next sync.
+
+    """
+    def __init__(
+            self,
+            whmcs,
+            store):
+        """
+        Create a new instance.
+
+        Args:
+            whmcs (whmcspy.api.WHMCS): The WHMCS interface.
+            store (SyncStore): The store of the sync state.
+
+        """
+        self.whmcs = whmcs
+        self.store = store
+
+    def sync(
+            self,
+            entity,
+            stop_at_watermark=False,
+            **params):
+        """
+        Sync an entity.
+
+        By default all records are fetched from WHMCS, but only the new or
+        changed ones are yielded. When `stop_at_watermark` is set the
+        listing stops at the first record which isn't newer than the
+        highest value of the sort field seen by the previous sync, so only
+        the new records are fetched. This requires the listing to be sorted
+        in descending order (see :data:`ENTITIES`), and doesn't detect
+        changes of older records.
+
+        Args:
+            entity (str): The entity to sync, see :data:`ENTITIES`.
+            **params: Additional params for the listing method.
+
+        Keyword Args:
+            stop_at_watermark (bool): Stop at the watermark of the previous
+                sync.
+
+        Yields:
+            The new or changed records.
+
+        """
+        method, sort_field = ENTITIES[entity]
+        if stop_at_watermark and sort_field is None:
+            raise ValueError(f'{entity} can\'t be synced by watermark.')
+        with self.store.lock:
+            watermark = self.store.get_watermark(entity)
+        stop = None
+        if stop_at_watermark and watermark is not None:
+            stop = _watermark_key(watermark)
+        highest = watermark
+        hashes = {}
+        for record in getattr(self.whmcs, method)(**params):
+            if sort_field is not None:
+                key = _watermark_key(record[sort_field])
+                if stop is not None and key <= stop:
+                    break
+                if highest is None or key > _watermark_key(highest):
+                    highest = str(record[sort_field])
+            hash_ = _hash(record)
+            with self.store.lock:
+                stored = self.store.get_hash(entity, record['id'])
+            if stored == hash_:
+                continue
+            hashes[record['id']] = hash_
+            yield record
+        with self.store.lock, self.store.connection:
+            self.store.set_hashes(entity, hashes)
+            if highest is not None:
+                self.store.set_watermark(entity, highest)
+
+    def clients_products(self, **params):
+        """
+        Sync client products.
+
+        See :func:`sync`.
+
+        """
+        return self.sync('clients_products', **params)
+
+    def orders(self, **params):
+        """
+        Sync orders.
+
+        See :func:`sync`.
+
+        """
+        return self.sync('orders', **params)
+
+    def tickets(self, **params):
+        """
+        Sync tickets.
+
+        See :func:`sync`.
+
+        """
+        return self.sync('tickets', **params)
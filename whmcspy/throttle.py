@@ -0,0 +1,275 @@
+import contextlib
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter.
+
+    The limiter is thread safe, so a single limiter can be shared by
+    multiple threads.
+
+    """
+    def __init__(
+            self,
+            rate,
+            burst=None):
+        """
+        Create a new instance.
+
+        Args:
+            rate (float): The number of acquisitions allowed per second.
+
+        Keyword Args:
+            burst (int): The number of acquisitions allowed at once. Defaults
+                to a second worth of acquisitions (at least 1).
+
+        """
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Acquire a token, blocking until one is available.
+
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst,
+                    self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+class FileRateLimiter:
+    """
+    Token bucket rate limiter shared by processes using a file.
+
+    The state of the bucket is kept in a file which is locked while it's
+    updated, so processes on the same host using the same file share the
+    rate.
+
+    Note:
+        This requires file locking support (fcntl), so it's not available
+        on Windows.
+
+    """
+    def __init__(
+            self,
+            path,
+            rate,
+            burst=None):
+        """
+        Create a new instance.
+
+        Args:
+            path (str): The path of the state file. It's created if it
+                doesn't exist.
+            rate (float): The number of acquisitions allowed per second.
+
+        Keyword Args:
+            burst (int): The number of acquisitions allowed at once. Defaults
+                to a second worth of acquisitions (at least 1).
+
+        """
+        self.path = path
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+
+    def acquire(self):
+        """
+        Acquire a token, blocking until one is available.
+
+        """
+        import fcntl
+        while True:
+            with open(self.path, 'a+') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                state = f.read().split()
+                now = time.time()
+                tokens = self.burst
+                if len(state) == 2:
+                    tokens = min(
+                        self.burst,
+                        float(state[0])
+                        + max(0.0, now - float(state[1])) * self.rate)
+                delay = 0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    delay = (1 - tokens) / self.rate
+                f.seek(0)
+                f.truncate()
+                f.write(f'{tokens} {now}')
+            if not delay:
+                return
+            time.sleep(delay)
+
+
+class _Semaphore:
+    """
+    Semaphore limiting the number of threads in flight.
+
+    """
+    def __init__(self, value):
+        self._semaphore = threading.BoundedSemaphore(value)
+
+    def acquire(self):
+        self._semaphore.acquire()
+
+    def release(self, slot):
+        self._semaphore.release()
+
+
+class FileSemaphore:
+    """
+    Semaphore shared by processes using lock files.
+
+    Every slot is a lock file, a slot is taken by locking its file. Locks
+    are released automatically when a process exits.
+
+    Note:
+        This requires file locking support (fcntl), so it's not available
+        on Windows.
+
+    """
+    def __init__(
+            self,
+            path,
+            value,
+            poll_interval=0.01):
+        """
+        Create a new instance.
+
+        Args:
+            path (str): The path prefix of the lock files. The files are
+                created if they don't exist.
+            value (int): The number of slots.
+
+        Keyword Args:
+            poll_interval (float): The time in seconds to wait before trying
+                again when all slots are taken.
+
+        """
+        self.path = path
+        self.value = value
+        self.poll_interval = poll_interval
+
+    def acquire(self):
+        """
+        Take a slot, blocking until one is available.
+
+        Returns:
+            The slot to pass to :func:`release`.
+
+        """
+        import fcntl
+        while True:
+            for index in range(self.value):
+                f = open(f'{self.path}.{index}', 'a')
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    f.close()
+                    continue
+                return f
+            time.sleep(self.poll_interval)
+
+    def release(self, slot):
+        """
+        Release a slot.
+
+        Args:
+            slot: The slot returned by :func:`acquire`.
+
+        """
+        slot.close()
+
+
+class Governor:
+    """
+    Rate and concurrency limits for WHMCS calls.
+
+    Reads and writes have separate rate limits, the maximum number of calls
+    in flight applies to both. A governor can be shared by multiple
+    :class:`whmcspy.api.WHMCS` instances and threads. When a path is given
+    the limits are shared through files by all processes on the host using
+    the same path.
+
+    """
+    def __init__(
+            self,
+            read_rate=None,
+            write_rate=None,
+            max_in_flight=None,
+            read_burst=None,
+            write_burst=None,
+            path=None):
+        """
+        Create a new instance.
+
+        Keyword Args:
+            read_rate (float): The maximum number of read calls per second.
+            write_rate (float): The maximum number of other calls per
+                second.
+            max_in_flight (int): The maximum number of calls in flight.
+            read_burst (int): The number of read calls allowed at once, see
+                :class:`RateLimiter`.
+            write_burst (int): The number of other calls allowed at once,
+                see :class:`RateLimiter`.
+            path (str): The path prefix of the files used to share the
+                limits between processes. If not given the limits apply to
+                the current process only.
+
+        """
+        if path is None:
+            def limiter(kind, rate, burst):
+                return RateLimiter(rate, burst)
+            semaphore = _Semaphore
+        else:
+            def limiter(kind, rate, burst):
+                return FileRateLimiter(f'{path}.{kind}', rate, burst)
+
+            def semaphore(value):
+                return FileSemaphore(f'{path}.slot', value)
+        self.read_limiter = read_rate and limiter(
+            'read',
+            read_rate,
+            read_burst)
+        self.write_limiter = write_rate and limiter(
+            'write',
+            write_rate,
+            write_burst)
+        self.semaphore = max_in_flight and semaphore(max_in_flight)
+
+    @contextlib.contextmanager
+    def limit(self, read=True):
+        """
+        Wait until a call is allowed and hold its in flight slot.
+
+        Args:
+            read (bool): Whether the call is a read call.
+
+        """
+        limiter = self.read_limiter if read else self.write_limiter
+        if limiter:
+            limiter.acquire()
+        if not self.semaphore:
+            yield
+            return
+        slot = self.semaphore.acquire()
+        try:
+            yield
+        finally:
+            self.semaphore.release(slot)
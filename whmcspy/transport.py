@@ -0,0 +1,704 @@
+import contextlib
+import io
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+from whmcspy import coalesce
+from whmcspy import encoding
+from whmcspy import exceptions
+
+
+HEADERS = {
+    'Content-Type': encoding.CONTENT_TYPE,
+}
+"""
+The headers of an API call.
+"""
+
+
+class Response:
+    """
+    A response of a transport.
+
+    Attributes:
+        status_code (int): The HTTP status code.
+        headers: The headers (a mapping with lowercase or case insensitive
+            keys).
+        content (bytes): The body, None for a streamed response.
+        raw: A file-like object to read the body from, only set for a
+            streamed response.
+        bytes_sent (int): The size of the request body.
+
+    """
+    __slots__ = (
+        'status_code',
+        'headers',
+        'content',
+        'raw',
+        'bytes_sent',
+    )
+
+    def __init__(
+            self,
+            status_code,
+            headers,
+            content=None,
+            raw=None,
+            bytes_sent=0):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.raw = raw
+        self.bytes_sent = bytes_sent
+
+    @property
+    def bytes_received(self):
+        """
+        int: The size of the (read part of the) body.
+
+        """
+        if self.content is not None:
+            return len(self.content)
+        return self.raw.tell()
+
+
+class Transport:
+    """
+    The base class of transports.
+
+    A transport posts the payloads of API calls to WHMCS. Every transport
+    counts its requests, the bytes sent and received and the time spent
+    waiting for responses, see :attr:`stats`. Subclasses implement
+    :func:`_post` and optionally :func:`_stream`.
+
+    Attributes:
+        retry_exceptions (tuple): The exceptions raised by the transport on
+            connection errors and timeouts, which can be retried.
+
+    """
+    retry_exceptions = ()
+
+    def __init__(self):
+        """
+        Create a new instance.
+
+        """
+        self._lock = threading.Lock()
+        self.reset()
+
+    @property
+    def stats(self):
+        """
+        dict: The number of `requests` (with a response), the number of
+        `errors` (without a response), the `bytes_sent` and
+        `bytes_received` and the `time` in seconds spent waiting for
+        responses (for streamed responses until the headers are received).
+
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def reset(self):
+        """
+        Reset the counters.
+
+        """
+        with self._lock:
+            self._stats = {
+                'requests': 0,
+                'errors': 0,
+                'bytes_sent': 0,
+                'bytes_received': 0,
+                'time': 0.0,
+            }
+
+    def _count(
+            self,
+            response,
+            elapsed):
+        with self._lock:
+            stats = self._stats
+            if response is None:
+                stats['errors'] += 1
+            else:
+                stats['requests'] += 1
+                stats['bytes_sent'] += response.bytes_sent
+                stats['bytes_received'] += response.bytes_received
+            stats['time'] += elapsed
+
+    def post(self, url, payload):
+        """
+        Post a payload.
+
+        Args:
+            url (str): The URL to post to.
+            payload (dict): The payload, see
+                :func:`whmcspy.encoding.encode`.
+
+        Returns:
+            Response: The response.
+
+        """
+        response = None
+        start = time.perf_counter()
+        try:
+            response = self._post(url, payload)
+        finally:
+            self._count(response, time.perf_counter() - start)
+        return response
+
+    @contextlib.contextmanager
+    def stream(self, url, payload):
+        """
+        Post a payload and stream the response body.
+
+        Args:
+            url (str): The URL to post to.
+            payload (dict): The payload, see
+                :func:`whmcspy.encoding.encode`.
+
+        Yields:
+            Response: The response, with the body readable from `raw`.
+
+        """
+        counted = False
+        start = time.perf_counter()
+        try:
+            with self._stream(url, payload) as response:
+                elapsed = time.perf_counter() - start
+                counted = True
+                try:
+                    yield response
+                finally:
+                    self._count(response, elapsed)
+        finally:
+            if not counted:
+                self._count(None, time.perf_counter() - start)
+
+    def _post(self, url, payload):
+        """
+        Post a payload, see :func:`post`.
+
+        """
+        raise NotImplementedError
+
+    @contextlib.contextmanager
+    def _stream(self, url, payload):
+        """
+        Post a payload and stream the response body, see :func:`stream`.
+
+        By default the whole body is read by :func:`_post`.
+
+        """
+        response = self._post(url, payload)
+        response.raw = io.BytesIO(response.content)
+        response.content = None
+        yield response
+
+    def close(self):
+        """
+        Release the resources of the transport.
+
+        """
+
+
+class SessionTransport(Transport):
+    """
+    Transport using a pooled requests session.
+
+    """
+    def __init__(
+            self,
+            session=None,
+            pool_connections=10,
+            pool_maxsize=10,
+            pool_block=False):
+        """
+        Create a new instance.
+
+        Keyword Args:
+            session (requests.Session): Use this session instead of creating
+                a new one. A given session isn't closed by :func:`close`.
+            pool_connections (int): The number of connection pools (hosts)
+                to cache.
+            pool_maxsize (int): The maximum number of connections to keep
+                alive per host.
+            pool_block (bool): Block when no free connection is available
+                instead of opening a connection which isn't kept.
+
+        """
+        import requests
+        import requests.adapters
+        super().__init__()
+        self._owns_session = session is None
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        self.session = session
+        self.retry_exceptions = (
+            requests.ConnectionError,
+            requests.Timeout,
+        )
+
+    def _post(self, url, payload):
+        body = encoding.encode(payload)
+        response = self.session.post(
+            url,
+            verify=False,
+            data=body,
+            headers=HEADERS)
+        return Response(
+            response.status_code,
+            response.headers,
+            content=response.content,
+            bytes_sent=len(body))
+
+    @contextlib.contextmanager
+    def _stream(self, url, payload):
+        body = encoding.encode(payload)
+        with self.session.post(
+                url,
+                verify=False,
+                data=body,
+                headers=HEADERS,
+                stream=True) as response:
+            response.raw.decode_content = True
+            yield Response(
+                response.status_code,
+                response.headers,
+                raw=response.raw,
+                bytes_sent=len(body))
+
+    def close(self):
+        if self._owns_session:
+            self.session.close()
+
+
+class Urllib3Transport(Transport):
+    """
+    Transport using an urllib3 pool manager directly.
+
+    This skips the request preparation of requests, which makes calls
+    cheaper.
+
+    """
+    def __init__(
+            self,
+            num_pools=10,
+            maxsize=10,
+            block=False,
+            timeout=None,
+            pool_manager=None):
+        """
+        Create a new instance.
+
+        Keyword Args:
+            num_pools (int): The number of connection pools (hosts) to
+                cache.
+            maxsize (int): The maximum number of connections to keep alive
+                per host.
+            block (bool): Block when no free connection is available
+                instead of opening a connection which isn't kept.
+            timeout (float): The connect and read timeout in seconds.
+            pool_manager (urllib3.PoolManager): Use this pool manager
+                instead of creating a new one. A given pool manager isn't
+                cleared by :func:`close`.
+
+        """
+        import urllib3
+        super().__init__()
+        self._owns_pool_manager = pool_manager is None
+        if pool_manager is None:
+            pool_manager = urllib3.PoolManager(
+                num_pools=num_pools,
+                maxsize=maxsize,
+                block=block,
+                timeout=timeout,
+                cert_reqs='CERT_NONE')
+        self.pool_manager = pool_manager
+        self.retry_exceptions = (
+            urllib3.exceptions.HTTPError,
+        )
+
+    def _post(self, url, payload):
+        body = encoding.encode(payload)
+        response = self.pool_manager.request(
+            'POST',
+            url,
+            body=body,
+            headers=HEADERS,
+            retries=False)
+        return Response(
+            response.status,
+            response.headers,
+            content=response.data,
+            bytes_sent=len(body))
+
+    @contextlib.contextmanager
+    def _stream(self, url, payload):
+        body = encoding.encode(payload)
+        response = self.pool_manager.request(
+            'POST',
+            url,
+            body=body,
+            headers=HEADERS,
+            retries=False,
+            preload_content=False)
+        try:
+            yield Response(
+                response.status,
+                response.headers,
+                raw=response,
+                bytes_sent=len(body))
+        finally:
+            response.release_conn()
+
+    def close(self):
+        if self._owns_pool_manager:
+            self.pool_manager.clear()
+
+
+class _ChunkReader(io.RawIOBase):
+    """
+    A file-like object reading from an iterator of chunks.
+
+    """
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._buffer = b''
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self._buffer:
+            self._buffer = next(self._chunks, b'')
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        self._position += size
+        return size
+
+    def tell(self):
+        return self._position
+
+
+class HttpxTransport(Transport):
+    """
+    Transport using an httpx client, optionally using HTTP/2.
+
+    With HTTP/2 concurrent calls are multiplexed over a single connection.
+
+    Note:
+        This requires httpx to be installed (``pip install whmcspy[async]``)
+        and for HTTP/2 also h2 (``pip install whmcspy[http2]``).
+
+    """
+    def __init__(
+            self,
+            http2=False,
+            max_connections=10,
+            max_keepalive_connections=10,
+            timeout=None,
+            client=None):
+        """
+        Create a new instance.
+
+        Keyword Args:
+            http2 (bool): Use HTTP/2 when the server supports it.
+            max_connections (int): The maximum number of concurrent
+                connections.
+            max_keepalive_connections (int): The maximum number of
+                connections to keep alive.
+            timeout (float): The timeout in seconds.
+            client (httpx.Client): Use this client instead of creating a new
+                one. A given client isn't closed by :func:`close`.
+
+        """
+        import httpx
+        super().__init__()
+        self._owns_client = client is None
+        if client is None:
+            client = httpx.Client(
+                http2=http2,
+                verify=False,
+                timeout=timeout,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_keepalive_connections))
+        self.client = client
+        self.retry_exceptions = (
+            httpx.TransportError,
+        )
+
+    def _post(self, url, payload):
+        body = encoding.encode(payload)
+        response = self.client.post(
+            url,
+            content=body,
+            headers=HEADERS)
+        return Response(
+            response.status_code,
+            response.headers,
+            content=response.content,
+            bytes_sent=len(body))
+
+    @contextlib.contextmanager
+    def _stream(self, url, payload):
+        body = encoding.encode(payload)
+        with self.client.stream(
+                'POST',
+                url,
+                content=body,
+                headers=HEADERS) as response:
+            yield Response(
+                response.status_code,
+                response.headers,
+                raw=_ChunkReader(response.iter_bytes()),
+                bytes_sent=len(body))
+
+    def close(self):
+        if self._owns_client:
+            self.client.close()
+
+
+TRANSPORTS = (
+    'http2',
+    'httpx',
+    'requests',
+    'urllib3',
+)
+"""
+The names of the transports which can be created by :func:`create`.
+"""
+
+
+def create(
+        name,
+        pool_connections=10,
+        pool_maxsize=10,
+        pool_block=False,
+        session=None):
+    """
+    Create a transport by name.
+
+    The names are:
+
+    - ``requests``: :class:`SessionTransport`.
+    - ``urllib3``: :class:`Urllib3Transport`.
+    - ``httpx``: :class:`HttpxTransport`.
+    - ``http2``: :class:`HttpxTransport` using HTTP/2.
+
+    Args:
+        name (str): The name of the transport.
+
+    Keyword Args:
+        pool_connections (int): The number of connection pools (hosts) to
+            cache.
+        pool_maxsize (int): The maximum number of connections to keep alive
+            per host.
+        pool_block (bool): Block when no free connection is available
+            instead of opening a connection which isn't kept.
+        session (requests.Session): The session of a ``requests``
+            transport.
+
+    Returns:
+        Transport: The transport.
+
+    Raises:
+        ValueError: When the name is unknown.
+
+    """
+    if name == 'requests':
+        return SessionTransport(
+            session=session,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block)
+    if name == 'urllib3':
+        return Urllib3Transport(
+            num_pools=pool_connections,
+            maxsize=pool_maxsize,
+            block=pool_block)
+    if name in ('httpx', 'http2'):
+        return HttpxTransport(
+            http2=name == 'http2',
+            max_connections=pool_maxsize if pool_block else None,
+            max_keepalive_connections=pool_maxsize)
+    raise ValueError(f'Unknown transport: {name}')
+
+
+_RECORD_HEADER = struct.Struct('<II')
+
+
+def _cassette_key(payload):
+    """
+    Get the key of a request in a cassette.
+
+    The key consists of the action and the normalized params, see
+    :func:`whmcspy.coalesce.request_key`.
+
+    Args:
+        payload (dict): The payload of the request.
+
+    Returns:
+        str: The key.
+
+    """
+    return json.dumps(
+        coalesce.request_key(payload),
+        separators=(',', ':'))
+
+
+class RecordingTransport(Transport):
+    """
+    Transport recording the calls of another transport to a cassette.
+
+    A cassette is a file of records, every record consists of the sizes of
+    its header and body, a JSON header (with the key of the request, the
+    status code, the headers of the response and the size of the request
+    body) and the response body. Records are appended as calls complete, so
+    recording can be resumed by using the same cassette. Credentials aren't
+    recorded.
+
+    """
+    def __init__(self, transport, path):
+        """
+        Create a new instance.
+
+        Args:
+            transport (Transport): The transport performing the calls.
+            path (str): The path of the cassette.
+
+        """
+        super().__init__()
+        self.transport = transport
+        self.retry_exceptions = transport.retry_exceptions
+        self.path = path
+        self._file = open(path, 'ab')
+        self._file_lock = threading.Lock()
+
+    def _post(self, url, payload):
+        response = self.transport.post(url, payload)
+        header = json.dumps({
+            'key': _cassette_key(payload),
+            'status': response.status_code,
+            'headers': {
+                name.lower(): value
+                for name, value in response.headers.items()
+            },
+            'sent': response.bytes_sent,
+        }, separators=(',', ':')).encode()
+        with self._file_lock:
+            self._file.write(_RECORD_HEADER.pack(
+                len(header),
+                len(response.content)))
+            self._file.write(header)
+            self._file.write(response.content)
+        return response
+
+    def close(self):
+        with self._file_lock:
+            self._file.close()
+        self.transport.close()
+
+
+class ReplayTransport(Transport):
+    """
+    Transport serving the responses recorded in a cassette.
+
+    The cassette is memory mapped and indexed when opened, responses are
+    looked up by the action and the normalized params of a request. When a
+    request was recorded more than once, its responses are served in the
+    recorded order and the last one is repeated.
+
+    See :class:`RecordingTransport`.
+
+    """
+    def __init__(self, path):
+        """
+        Create a new instance.
+
+        Args:
+            path (str): The path of the cassette.
+
+        """
+        super().__init__()
+        self.path = path
+        self._index = {}
+        self._served = {}
+        self._served_lock = threading.Lock()
+        with open(path, 'rb') as f:
+            if not os.fstat(f.fileno()).st_size:
+                self._map = b''
+                return
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        offset = 0
+        while offset < len(self._map):
+            header_size, body_size = _RECORD_HEADER.unpack_from(
+                self._map,
+                offset)
+            offset += _RECORD_HEADER.size
+            header = json.loads(self._map[offset:offset + header_size])
+            offset += header_size
+            self._index.setdefault(header['key'], []).append((
+                header['status'],
+                header['headers'],
+                header['sent'],
+                offset,
+                body_size,
+            ))
+            offset += body_size
+
+    def __len__(self):
+        return sum(len(records) for records in self._index.values())
+
+    def responses(self):
+        """
+        Iterate over the recorded responses.
+
+        Yields:
+            tuple: The key of the request and the response.
+
+        """
+        for key, records in self._index.items():
+            for status, headers, sent, offset, size in records:
+                yield key, Response(
+                    status,
+                    headers,
+                    content=self._map[offset:offset + size],
+                    bytes_sent=sent)
+
+    def _post(self, url, payload):
+        key = _cassette_key(payload)
+        records = self._index.get(key)
+        if records is None:
+            raise exceptions.Error(
+                f'No recorded response for {payload["action"]}: {key}')
+        if len(records) == 1:
+            record = records[0]
+        else:
+            with self._served_lock:
+                served = self._served.get(key, 0)
+                self._served[key] = served + 1
+            record = records[min(served, len(records) - 1)]
+        status, headers, sent, offset, size = record
+        return Response(
+            status,
+            headers,
+            content=self._map[offset:offset + size],
+            bytes_sent=sent)
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()